@@ -10,8 +10,10 @@ from sqlalchemy.ext.declarative import declarative_base
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Create database engine using Streamlit secrets
-engine = create_engine(st.secrets["database_url"])
+# Create database engine using Streamlit secrets; the module is imported once per
+# process, so its connection pool is shared by every rerun. Pre-ping replaces
+# pooled connections the server has dropped instead of failing the query.
+engine = create_engine(st.secrets["database_url"], pool_pre_ping=True)
 
 # Create sessionmaker
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -22,6 +24,16 @@ ScopedSession = scoped_session(SessionLocal)
 # Create Base class for declarative models
 Base = declarative_base()
 
+@st.cache_resource
+def get_session_factory() -> sessionmaker:
+    """
+    Get a session factory that is created once per process and reused across reruns.
+    Usage:
+        db = get_session_factory()()
+    Committed objects are not expired, so they can still be read after commit.
+    """
+    return sessionmaker(autoflush=False, bind=engine, expire_on_commit=False)
+
 def get_db() -> Session:
     """Get database session."""
     db = SessionLocal()
@@ -213,6 +213,21 @@ def run_migrations():
     except Exception as e:
         logger.error(f"Error running migrations: {str(e)}")
         # Continue with other init tasks even if migrations fail
+    
+    # create_all doesn't add columns to existing tables, so older databases need
+    # the stored difficulty label added and backfilled; a no-op once it has run
+    try:
+        from migrate_questions_table import add_difficulty_label_column
+        add_difficulty_label_column()
+    except Exception as e:
+        logger.error(f"Error adding difficulty_label column: {str(e)}")
+    
+    # Likewise for the indexes on the questions table's filter and join columns
+    try:
+        from migrate_questions_table import add_question_indexes
+        add_question_indexes()
+    except Exception as e:
+        logger.error(f"Error adding question indexes: {str(e)}")
 
 # Main initialization function
 def initialize_database():
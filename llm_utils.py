@@ -1,45 +1,467 @@
 import os
 import logging
 import json
-from typing import Dict, Any, Optional, Tuple, List
-from groq import Groq
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import httpx
+from typing import Dict, Any, Optional, Tuple, List, Literal, Callable
+from groq import Groq, AsyncGroq, BadRequestError
+from pydantic import BaseModel, TypeAdapter, ValidationError, field_validator
 import streamlit as st
-import re
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+# Prefer orjson for parsing LLM responses; it raises a json.JSONDecodeError subclass,
+# so the existing error handling works unchanged with either parser
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
 logger = logging.getLogger(__name__)
 
+class QuestionAnalysis(BaseModel):
+    """Schema of the JSON object returned by the LLM in analyze_question."""
+    difficulty_rating: float
+    estimated_time: int = 5
+    student_level: Literal["Beginner", "Intermediate", "Advanced"] = "Intermediate"
+    improvement_suggestions: str = "No specific improvement suggestions provided."
+    
+    @field_validator("difficulty_rating", mode="before")
+    @classmethod
+    def _clamp_difficulty(cls, value):
+        if value is None:
+            raise ValueError("No difficulty rating provided")
+        # Ensure it's between 1 and 5
+        return max(1.0, min(5.0, float(value)))
+    
+    @field_validator("estimated_time", mode="before")
+    @classmethod
+    def _clamp_time(cls, value):
+        # Default to 5 minutes if not provided, otherwise keep it between 1 and 60 minutes
+        if value is None:
+            return 5
+        return max(1, min(60, int(float(value))))
+    
+    @field_validator("student_level", mode="before")
+    @classmethod
+    def _normalize_level(cls, value):
+        # Normalize student level to one of the three categories
+        level = str(value or "").lower()
+        if "beginner" in level:
+            return "Beginner"
+        if "advanced" in level:
+            return "Advanced"
+        return "Intermediate"
+    
+    @field_validator("improvement_suggestions", mode="before")
+    @classmethod
+    def _default_suggestions(cls, value):
+        if isinstance(value, list):
+            value = "\n".join(f"- {item}" for item in value)
+        return value or "No specific improvement suggestions provided."
+
+_ANALYSIS_ADAPTER = TypeAdapter(QuestionAnalysis)
+
+def _format_analysis_text(analysis: QuestionAnalysis) -> str:
+    """Create a formatted analysis text that includes all the information."""
+    return f"""## Question Analysis
+
+**Difficulty Rating:** {analysis.difficulty_rating}/5.0
+
+**Estimated Time:** {analysis.estimated_time} minutes
+
+**Appropriate Student Level:** {analysis.student_level}
+
+{_ANALYSIS_SUGGESTIONS_HEADER}
+{analysis.improvement_suggestions}
+"""
+
+# Labels written by _format_analysis_text, mapped to the QuestionAnalysis fields they hold
+_ANALYSIS_TEXT_FIELDS = {
+    "**Difficulty Rating:**": "difficulty_rating",
+    "**Estimated Time:**": "estimated_time",
+    "**Appropriate Student Level:**": "student_level",
+}
+
+# Header of the LLM-written suggestions that _format_analysis_text puts after the fields
+_ANALYSIS_SUGGESTIONS_HEADER = "### Improvement Suggestions:"
+
+# Prefix of the analysis text returned when the LLM response could not be parsed;
+# such results carry a placeholder difficulty rather than a real rating
+_RAW_ANALYSIS_PREFIX = "Analysis (raw): "
+
+def is_raw_analysis(analysis_text: Optional[str]) -> bool:
+    """Return True if analysis_text is the unparsed fallback rather than a real analysis."""
+    return bool(analysis_text) and analysis_text.startswith(_RAW_ANALYSIS_PREFIX)
+
+def parse_analysis_text(analysis_text: str) -> Optional[QuestionAnalysis]:
+    """
+    Recover the structured fields from an analysis_text returned by analyze_question.
+    
+    The text is scanned once line by line, so callers don't need a regex per field.
+    Scanning stops at the improvement suggestions, which are LLM-written and may
+    contain lines that look like the fields above them.
+    Returns None if the text is not in the formatted layout (e.g. a raw fallback response).
+    """
+    fields = {}
+    for line in analysis_text.splitlines():
+        if line.startswith(_ANALYSIS_SUGGESTIONS_HEADER):
+            break
+        label, sep, value = line.partition(":** ")
+        name = _ANALYSIS_TEXT_FIELDS.get(label + ":**") if sep else None
+        if name and value and name not in fields:
+            # Drop units such as "/5.0" and "minutes"
+            fields[name] = value.split()[0].partition("/")[0]
+    
+    try:
+        return _ANALYSIS_ADAPTER.validate_python(fields)
+    except ValidationError:
+        return None
+
+# Connection pool settings for the shared Groq HTTP client
+_HTTP_LIMITS = httpx.Limits(max_keepalive_connections=20, max_connections=40)
+_HTTP_TIMEOUT = 30.0
+
+def _create_http_client() -> httpx.Client:
+    """Create the HTTP client used by Groq, multiplexing requests over HTTP/2 when available."""
+    try:
+        return httpx.Client(http2=True, limits=_HTTP_LIMITS, timeout=_HTTP_TIMEOUT)
+    except ImportError:
+        # HTTP/2 support needs the optional h2 package (httpx[http2])
+        logger.warning("h2 package not installed, Groq client will use HTTP/1.1")
+        return httpx.Client(limits=_HTTP_LIMITS, timeout=_HTTP_TIMEOUT)
+
+@st.cache_resource(show_spinner=False)
+def _create_groq_client(api_key: str) -> Groq:
+    """Create a Groq client once per API key and reuse it (and its connection pool) across reruns."""
+    client = Groq(api_key=api_key, http_client=_create_http_client())
+    logger.info("Groq client initialized successfully")
+    return client
+
+def _get_groq_api_key() -> Optional[str]:
+    """Read the Groq API key from the .env file / environment or Streamlit secrets."""
+    # Try to get API key from environment variable first (from .env file)
+    api_key = os.environ.get("GROQ_API_KEY")
+    
+    # Fall back to Streamlit secrets if not found in environment
+    if not api_key:
+        try:
+            api_key = st.secrets["groq_api_key"]
+        except:
+            logger.warning("GROQ_API_KEY not found in Streamlit secrets, checking .env file")
+    
+    if not api_key:
+        logger.error("GROQ_API_KEY not found in environment or Streamlit secrets")
+        return None
+    
+    return api_key
+
 def get_groq_client() -> Groq:
     """Get Groq client using API key from .env file or Streamlit secrets."""
     try:
-        # Try to get API key from environment variable first (from .env file)
-        api_key = os.environ.get("GROQ_API_KEY")
-        
-        # Fall back to Streamlit secrets if not found in environment
-        if not api_key:
-            try:
-                api_key = st.secrets["groq_api_key"]
-            except:
-                logger.warning("GROQ_API_KEY not found in Streamlit secrets, checking .env file")
-        
+        api_key = _get_groq_api_key()
         if not api_key:
-            logger.error("GROQ_API_KEY not found in environment or Streamlit secrets")
             return None
             
-        client = Groq(api_key=api_key)
-        logger.info("Groq client initialized successfully")
-        return client
+        return _create_groq_client(api_key)
     except Exception as e:
         logger.error(f"Failed to initialize Groq client: {str(e)}")
         return None
 
-def analyze_question(
+# Set once the API rejects streaming combined with JSON mode, so later JSON-mode
+# calls go straight to a regular request instead of paying for a failed one first
+_json_streaming_rejected = False
+
+def _is_streaming_rejection(error: BadRequestError) -> bool:
+    """Return True if a 400 response is the API refusing to stream this request."""
+    return "stream" in str(error).lower()
+
+def _stream_completion(client: Groq, placeholder: Optional[Any] = None, **kwargs) -> str:
+    """
+    Run a chat completion with streaming enabled and return the full response text.
+    
+    Tokens are accumulated as they arrive and, if a Streamlit placeholder is given,
+    rendered progressively so the user sees output before generation finishes.
+    Falls back to a regular (non-streamed) request if the installed SDK doesn't support
+    streaming, or if the API rejects streaming in JSON mode; that rejection is remembered
+    for later calls. Any other BadRequestError is raised unchanged.
+    """
+    global _json_streaming_rejected
+    json_mode = (kwargs.get("response_format") or {}).get("type") == "json_object"
+    
+    if not (json_mode and _json_streaming_rejected):
+        try:
+            response = client.chat.completions.create(stream=True, **kwargs)
+            buf = []
+            for chunk in response:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content or ""
+                if delta:
+                    buf.append(delta)
+                    if placeholder is not None:
+                        placeholder.markdown("".join(buf))
+            return "".join(buf)
+        except TypeError as e:
+            logger.warning(f"Streaming not supported by the SDK, falling back to non-stream request: {e}")
+        except BadRequestError as e:
+            if not (json_mode and _is_streaming_rejection(e)):
+                raise
+            logger.warning(f"Streaming not supported in JSON mode, using non-stream requests from now on: {e}")
+            _json_streaming_rejected = True
+    
+    response = client.chat.completions.create(stream=False, **kwargs)
+    return response.choices[0].message.content
+
+# Cut generation short if the model trails off into blank lines. Code fences are not
+# a stop sequence: every call uses JSON mode, and questions for programming courses
+# can legitimately contain ``` inside a JSON string
+_STOP_SEQUENCES = ["\n\n\n"]
+
+# Token budget for generated questions: per question plus room for the JSON wrapper
+_TOKENS_PER_QUESTION = 256
+_TOKENS_OVERHEAD = 128
+
+# Request parameters shared by the single and batched analysis calls
+_ANALYSIS_PARAMS = {
+    "model": "llama-3.1-8b-instant",  # Using LLaMA 3 model
+    "temperature": 0.1,  # Lower temperature for more deterministic responses
+    "max_tokens": 400,  # The analysis JSON is ~250 tokens
+    "top_p": 1,
+    "stop": _STOP_SEQUENCES,
+    "response_format": {"type": "json_object"}  # Guarantee a valid JSON object
+}
+
+# Maximum number of concurrent Groq requests issued by analyze_questions_batch
+_BATCH_CONCURRENCY = 8
+
+# generate_questions_parallel splits a request into chunks of this many questions,
+# with at most _GENERATION_WORKERS chunk requests in flight
+_GENERATION_CHUNK_SIZE = 3
+_GENERATION_WORKERS = 4
+
+# Process-wide LRU cache of successful analyses, keyed on a hash of the inputs
+_ANALYSIS_CACHE_SIZE = 512
+_analysis_cache: "OrderedDict[bytes, Tuple[float, str]]" = OrderedDict()
+_analysis_cache_lock = threading.Lock()
+
+def _analysis_cache_key(
+    question_content: str, 
+    question_type: str, 
+    course_title: str, 
+    chapter_title: str, 
+    ilos: str
+) -> bytes:
+    """Build the cache key for an analysis request from all of its inputs."""
+    raw = "\x1f".join([course_title or "", chapter_title or "", question_type or "", ilos or "", question_content or ""])
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=16).digest()
+
+def _analysis_cache_get(key: bytes) -> Optional[Tuple[float, str]]:
+    """Return a cached analysis and mark it as recently used, or None on a miss."""
+    with _analysis_cache_lock:
+        result = _analysis_cache.get(key)
+        if result is not None:
+            _analysis_cache.move_to_end(key)
+        return result
+
+def _analysis_cache_put(key: bytes, result: Tuple[Optional[float], Optional[str]]) -> None:
+    """Store a successful analysis, evicting the least recently used entry when full."""
+    # Errors and unparsed responses are not cached so that they can be retried
+    if result[0] is None or is_raw_analysis(result[1]):
+        return
+    with _analysis_cache_lock:
+        _analysis_cache[key] = result
+        _analysis_cache.move_to_end(key)
+        if len(_analysis_cache) > _ANALYSIS_CACHE_SIZE:
+            _analysis_cache.popitem(last=False)
+
+# Time-estimation guidelines per question type; only the one matching the question is
+# sent, so the prompt doesn't carry rubrics that can't apply
+_TIME_RUBRICS: Dict[str, str] = {
+    "Multiple Choice": """   For Multiple Choice Questions:
+   - Basic recall MC questions: 30-60 seconds per option
+   - Application/analysis MC questions: 1-2 minutes per option
+   - Complex scenario-based MC questions: 2-3 minutes total plus 1 minute per option
+""",
+    "True/False": """   For True/False Questions:
+   - Simple factual T/F: 30-45 seconds
+   - Complex conceptual T/F: 1-2 minutes
+""",
+    "Short Answer": """   For Short Answer Questions:
+   - Basic recall: 2-3 minutes
+   - Application/analysis: 3-5 minutes
+   - Problem-solving: 5-8 minutes depending on complexity
+""",
+    "Essay": """   For Essay Questions:
+   - Brief response (paragraph): 5-8 minutes
+   - Standard essay: 10-20 minutes
+   - Complex analysis essay: 20-30 minutes
+""",
+    "Calculation": """   For Calculation/Problem-Solving Questions:
+   - Simple calculations: 1-2 minutes
+   - Multi-step problems: 3-5 minutes per step
+   - Complex applications: 10-15 minutes
+""",
+}
+
+# Unknown question types fall back to the full set of guidelines
+_TIME_RUBRICS_DEFAULT = "\n".join(_TIME_RUBRICS.values())
+
+# Static analysis rubric. It is sent as the system message so it is identical for every
+# request of the same question type, letting the provider reuse its cached prefix;
+# only the question fields vary.
+_ANALYSIS_SYSTEM_TEMPLATE = """You are an educational expert that analyzes academic questions and provides feedback. Always respond in valid JSON format.
+
+For each academic question you receive, analyze it and provide:
+
+1. DIFFICULTY RATING: Rate the question's difficulty on a scale of 1.0 to 5.0 (where 1 is easiest and 5 is hardest). Consider the complexity, cognitive load, and alignment with the ILOs.
+
+2. ESTIMATED TIME: Carefully evaluate and suggest a precise time (in minutes) that students would need to answer this question. You must be extremely accurate with time estimation. Follow these specific guidelines by question type:
+
+{time_rubric}
+   Additional factors to consider:
+   - Reading time: 200-250 words per minute for question text
+   - Cognitive complexity level (recall: fastest, create: slowest)
+   - Number of distinct concepts that must be integrated
+   - Time needed to review and check work (add 10-20% of total time)
+
+   Calculate the time precisely and provide a whole number of minutes. Be realistic and consider the actual time students need, not the ideal time.
+
+3. STUDENT LEVEL: Indicate which level of student this question is most appropriate for (Beginner, Intermediate, or Advanced).
+
+4. IMPROVEMENT SUGGESTIONS: Provide specific suggestions to improve the question's quality, clarity, and alignment with the ILOs. Consider aspects like:
+   - Clarity and precision of language
+   - Alignment with stated learning outcomes
+   - Cognitive level (knowledge, comprehension, application, analysis, etc.)
+   - Potential ambiguities or issues
+   - Suggestions for better wording or structure
+   - Whether the estimated time is appropriate for the question's complexity
+
+Format your response as a JSON object with the following structure:
+{{"difficulty_rating": float, "estimated_time": int, "student_level": string, "improvement_suggestions": string}}
+
+IMPORTANT: Ensure your response is ONLY the JSON object, with no additional text before or after."""
+
+# System prompts are built once per question type at import time
+_ANALYSIS_SYSTEM_PROMPTS: Dict[str, str] = {
+    question_type: _ANALYSIS_SYSTEM_TEMPLATE.format(time_rubric=rubric)
+    for question_type, rubric in _TIME_RUBRICS.items()
+}
+_ANALYSIS_SYSTEM_PROMPT_DEFAULT = _ANALYSIS_SYSTEM_TEMPLATE.format(time_rubric=_TIME_RUBRICS_DEFAULT)
+
+def _build_analysis_messages(
     question_content: str, 
     question_type: str, 
     course_title: str, 
     chapter_title: str, 
     ilos: str
+) -> List[Dict[str, str]]:
+    """Build the chat messages used to ask the LLM to analyze a question."""
+    # Only the variable fields go in the user message; the rubric lives in the system prompt
+    user_prompt = (
+        f"COURSE: {course_title}\n"
+        f"CHAPTER: {chapter_title}\n"
+        f"QUESTION TYPE: {question_type}\n"
+        f"INTENDED LEARNING OUTCOMES (ILOs): {ilos}\n"
+        f"QUESTION: {question_content}\n"
+        "Return the analysis JSON object."
+    )
+    
+    return [
+        {"role": "system", "content": _ANALYSIS_SYSTEM_PROMPTS.get(question_type, _ANALYSIS_SYSTEM_PROMPT_DEFAULT)},
+        {"role": "user", "content": user_prompt}
+    ]
+
+def _extract_json_object(text: str) -> Optional[str]:
+    """
+    Return the first balanced {...} block in text, or None if there is none.
+    
+    Used only when a response is not valid JSON as a whole (e.g. the model wrapped it
+    in prose). A single linear scan with a depth counter that skips over string
+    literals, so it stays O(n) on large responses unlike a backtracking regex.
+    """
+    start = text.find("{")
+    if start == -1:
+        return None
+    
+    depth = 0
+    in_string = False
+    escaped = False
+    for i in range(start, len(text)):
+        char = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char == "{":
+            depth += 1
+        elif char == "}":
+            depth -= 1
+            if depth == 0:
+                return text[start:i + 1]
+    
+    return None
+
+def _loads_json_object(text: str) -> Any:
+    """Parse an LLM response as JSON, falling back to the first embedded JSON object."""
+    try:
+        return _json_loads(text)
+    except json.JSONDecodeError:
+        block = _extract_json_object(text)
+        if block is None:
+            raise
+        logger.warning("LLM response was not pure JSON, parsing the embedded JSON object")
+        return _json_loads(block)
+
+def _parse_analysis_response(response_text: str) -> Tuple[Optional[float], Optional[str]]:
+    """Parse the raw LLM analysis response into (difficulty_rating, analysis_text)."""
+    # Extract and parse the response
+    response_text = response_text.strip()
+    logger.info(f"Received response from Groq API: {response_text[:100]}...")
+    
+    # The request uses JSON mode, so the response is a single JSON object
+    try:
+        # Parse and validate the JSON in a single pass; coercion, clamping and
+        # defaults are handled by the QuestionAnalysis model
+        analysis = _ANALYSIS_ADAPTER.validate_json(response_text)
+        
+        return analysis.difficulty_rating, _format_analysis_text(analysis)
+        
+    except ValidationError as e:
+        if any(err["loc"] == ("difficulty_rating",) for err in e.errors()):
+            logger.error("No difficulty rating found in response")
+            return None, "Error: No difficulty rating provided in analysis"
+        
+        logger.error(f"Failed to parse JSON from LLM response: {e}")
+        logger.error(f"Response text was: {response_text}")
+        
+        # Try to extract just the JSON object from the response
+        block = _extract_json_object(response_text)
+        if block is not None and block != response_text:
+            try:
+                analysis = _ANALYSIS_ADAPTER.validate_json(block)
+                return analysis.difficulty_rating, _format_analysis_text(analysis)
+            except ValidationError as nested_e:
+                logger.error(f"Failed to parse extracted JSON object: {nested_e}")
+        
+        # If all parsing attempts fail, return the raw response as improvement suggestions
+        return 3.0, f"{_RAW_ANALYSIS_PREFIX}{response_text}"
+
+def analyze_question(
+    question_content: str, 
+    question_type: str, 
+    course_title: str, 
+    chapter_title: str, 
+    ilos: str,
+    placeholder: Optional[Any] = None
 ) -> Tuple[Optional[float], Optional[str]]:
     """
     Analyze a question using Groq API with LLaMA 3 model to:
@@ -54,10 +476,18 @@ def analyze_question(
         course_title: The title of the course
         chapter_title: The title of the chapter
         ilos: The intended learning outcomes for the chapter
+        placeholder: Optional Streamlit placeholder (e.g. st.empty()) to render the streamed response into
         
     Returns:
         Tuple containing (difficulty_rating, analysis_text)
     """
+    # Identical questions return the cached analysis without calling the API
+    cache_key = _analysis_cache_key(question_content, question_type, course_title, chapter_title, ilos)
+    cached = _analysis_cache_get(cache_key)
+    if cached is not None:
+        logger.info("Returning cached question analysis")
+        return cached
+    
     # Get client for this request
     client = get_groq_client()
     if not client:
@@ -65,190 +495,173 @@ def analyze_question(
         return None, "Error: Groq client not initialized. Please check your API key configuration."
     
     try:
-        # Construct the prompt
-        system_prompt = "You are an educational expert that analyzes academic questions and provides feedback. Always respond in valid JSON format."
-        
-        user_prompt = f"""
-        Analyze this academic question and provide feedback:
-        
-        COURSE: {course_title}
-        CHAPTER: {chapter_title}
-        QUESTION TYPE: {question_type}
-        INTENDED LEARNING OUTCOMES (ILOs): {ilos}
-        
-        QUESTION: {question_content}
-        
-        Please analyze this question and provide:
-        
-        1. DIFFICULTY RATING: Rate the question's difficulty on a scale of 1.0 to 5.0 (where 1 is easiest and 5 is hardest). Consider the complexity, cognitive load, and alignment with the ILOs.
-        
-        2. ESTIMATED TIME: Carefully evaluate and suggest a precise time (in minutes) that students would need to answer this question. You must be extremely accurate with time estimation. Follow these specific guidelines by question type:
-
-           For Multiple Choice Questions:
-           - Basic recall MC questions: 30-60 seconds per option
-           - Application/analysis MC questions: 1-2 minutes per option
-           - Complex scenario-based MC questions: 2-3 minutes total plus 1 minute per option
-
-           For True/False Questions:
-           - Simple factual T/F: 30-45 seconds
-           - Complex conceptual T/F: 1-2 minutes
-
-           For Short Answer Questions:
-           - Basic recall: 2-3 minutes
-           - Application/analysis: 3-5 minutes
-           - Problem-solving: 5-8 minutes depending on complexity
-
-           For Essay Questions:
-           - Brief response (paragraph): 5-8 minutes
-           - Standard essay: 10-20 minutes
-           - Complex analysis essay: 20-30 minutes
-
-           For Calculation/Problem-Solving Questions:
-           - Simple calculations: 1-2 minutes
-           - Multi-step problems: 3-5 minutes per step
-           - Complex applications: 10-15 minutes
-
-           Additional factors to consider:
-           - Reading time: 200-250 words per minute for question text
-           - Cognitive complexity level (recall: fastest, create: slowest)
-           - Number of distinct concepts that must be integrated
-           - Time needed to review and check work (add 10-20% of total time)
-
-           Calculate the time precisely and provide a whole number of minutes. Be realistic and consider the actual time students need, not the ideal time.
-        
-        3. STUDENT LEVEL: Indicate which level of student this question is most appropriate for (Beginner, Intermediate, or Advanced).
-        
-        4. IMPROVEMENT SUGGESTIONS: Provide specific suggestions to improve the question's quality, clarity, and alignment with the ILOs. Consider aspects like:
-           - Clarity and precision of language
-           - Alignment with stated learning outcomes
-           - Cognitive level (knowledge, comprehension, application, analysis, etc.)
-           - Potential ambiguities or issues
-           - Suggestions for better wording or structure
-           - Whether the estimated time is appropriate for the question's complexity
-        
-        Format your response as a JSON object with the following structure:
-        {{"difficulty_rating": float, "estimated_time": int, "student_level": string, "improvement_suggestions": string}}
-        
-        IMPORTANT: Ensure your response is ONLY the JSON object, with no additional text before or after.
-        """
-        
         # Call the Groq API with LLaMA 3 model
-        response = client.chat.completions.create(
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            model="llama-3.1-8b-instant",  # Using LLaMA 3 model
-            temperature=0.1,  # Lower temperature for more deterministic responses
-            max_tokens=1024,
-            top_p=1,
-            stream=False
+        response_text = _stream_completion(
+            client,
+            placeholder=placeholder,
+            messages=_build_analysis_messages(question_content, question_type, course_title, chapter_title, ilos),
+            **_ANALYSIS_PARAMS
         )
         
-        # Extract and parse the response
-        response_text = response.choices[0].message.content.strip()
-        logger.info(f"Received response from Groq API: {response_text[:100]}...")
+        result = _parse_analysis_response(response_text)
+        _analysis_cache_put(cache_key, result)
+        return result
         
-        # Try to extract JSON from the response
-        try:
-            # Clean the response text to ensure it's valid JSON
-            # Remove any markdown code block markers
-            response_text = re.sub(r'```json\s*|\s*```', '', response_text)
-            # Remove any leading/trailing whitespace
-            response_text = response_text.strip()
-            
-            # Parse the JSON
-            result = json.loads(response_text)
-            
-            difficulty_rating = result.get("difficulty_rating")
-            estimated_time = result.get("estimated_time")
-            student_level = result.get("student_level")
-            improvement_suggestions = result.get("improvement_suggestions")
-            
-            # Validate difficulty rating
-            if difficulty_rating is not None:
-                difficulty_rating = float(difficulty_rating)
-                difficulty_rating = max(1.0, min(5.0, difficulty_rating))  # Ensure it's between 1 and 5
-            else:
-                logger.error("No difficulty rating found in response")
-                return None, "Error: No difficulty rating provided in analysis"
-            
-            # Validate estimated time
-            if estimated_time is not None:
-                estimated_time = int(estimated_time)
-                # Ensure time is reasonable (between 1 and 60 minutes)
-                estimated_time = max(1, min(60, estimated_time))
-            else:
-                estimated_time = 5  # Default to 5 minutes if not provided
-                
-            # Validate student level
-            if student_level is not None:
-                # Normalize student level to one of the three categories
-                student_level = student_level.lower()
-                if "beginner" in student_level:
-                    student_level = "Beginner"
-                elif "advanced" in student_level:
-                    student_level = "Advanced"
-                else:
-                    student_level = "Intermediate"
-            else:
-                student_level = "Intermediate"  # Default if not provided
-            
-            if not improvement_suggestions:
-                improvement_suggestions = "No specific improvement suggestions provided."
-            
-            # Create a formatted analysis text that includes all the information
-            analysis_text = f"""## Question Analysis
+    except Exception as e:
+        logger.error(f"Error calling Groq API: {str(e)}")
+        return None, f"Error calling Groq API: {str(e)}"
 
-**Difficulty Rating:** {difficulty_rating}/5.0
+async def _analyze_one(client: AsyncGroq, semaphore: asyncio.Semaphore, item: Dict[str, str]) -> Tuple[Optional[float], Optional[str]]:
+    """Analyze a single question on the shared async client, bounded by the semaphore."""
+    async with semaphore:
+        try:
+            response = await client.chat.completions.create(
+                messages=_build_analysis_messages(
+                    item["question_content"],
+                    item["question_type"],
+                    item["course_title"],
+                    item["chapter_title"],
+                    item["ilos"]
+                ),
+                **_ANALYSIS_PARAMS
+            )
+            return _parse_analysis_response(response.choices[0].message.content)
+        except Exception as e:
+            logger.error(f"Error calling Groq API: {str(e)}")
+            return None, f"Error calling Groq API: {str(e)}"
 
-**Estimated Time:** {estimated_time} minutes
+async def _analyze_all(api_key: str, items: List[Dict[str, str]]) -> List[Tuple[Optional[float], Optional[str]]]:
+    """Fan out all analysis requests concurrently over one async connection pool."""
+    semaphore = asyncio.Semaphore(_BATCH_CONCURRENCY)
+    async with AsyncGroq(api_key=api_key) as client:
+        return await asyncio.gather(*[_analyze_one(client, semaphore, item) for item in items])
 
-**Appropriate Student Level:** {student_level}
+def analyze_questions_batch(items: List[Dict[str, str]]) -> List[Tuple[Optional[float], Optional[str]]]:
+    """
+    Analyze several questions concurrently instead of one request after another.
+    
+    Args:
+        items: List of dicts with the same keys as the analyze_question arguments
+               (question_content, question_type, course_title, chapter_title, ilos)
+        
+    Returns:
+        List of (difficulty_rating, analysis_text) tuples in the same order as items
+    """
+    if not items:
+        return []
+    
+    keys = [
+        _analysis_cache_key(
+            item["question_content"],
+            item["question_type"],
+            item["course_title"],
+            item["chapter_title"],
+            item["ilos"]
+        )
+        for item in items
+    ]
+    results = [_analysis_cache_get(key) for key in keys]
+    pending = [i for i, result in enumerate(results) if result is None]
+    if not pending:
+        return results
+    
+    api_key = _get_groq_api_key()
+    if not api_key:
+        logger.error("Groq client not initialized. Cannot analyze questions.")
+        error = (None, "Error: Groq client not initialized. Please check your API key configuration.")
+        return [result if result is not None else error for result in results]
+    
+    # Only the questions missing from the cache are sent to the API
+    fresh = asyncio.run(_analyze_all(api_key, [items[i] for i in pending]))
+    for i, result in zip(pending, fresh):
+        _analysis_cache_put(keys[i], result)
+        results[i] = result
+    
+    return results
 
-### Improvement Suggestions:
-{improvement_suggestions}
-"""
-            
-            return difficulty_rating, analysis_text
-            
-        except json.JSONDecodeError as e:
-            logger.error(f"Failed to parse JSON from LLM response: {e}")
-            logger.error(f"Response text was: {response_text}")
-            
-            # Try to extract just the JSON part using regex
-            try:
-                json_match = re.search(r'\{[^{}]*\}', response_text)
-                if json_match:
-                    result = json.loads(json_match.group(0))
-                    difficulty_rating = float(result.get("difficulty_rating", 3.0))
-                    estimated_time = int(result.get("estimated_time", 5))
-                    student_level = result.get("student_level", "Intermediate")
-                    improvement_suggestions = result.get("improvement_suggestions", "No specific improvement suggestions provided.")
-                    
-                    # Create a formatted analysis text
-                    analysis_text = f"""## Question Analysis
+_GENERATION_SYSTEM_PROMPT = "You are an educational expert specialized in creating high-quality academic questions that assess understanding and critical thinking."
 
-**Difficulty Rating:** {difficulty_rating}/5.0
+# JSON structure every generated question must follow
+_QUESTION_SCHEMA = """{
+    "question_content": "The full question text",
+    "question_type": "Multiple Choice/True/False/Short Answer/Essay",
+    "difficulty": float (1.0-5.0 where 1=easiest, 5=hardest),
+    "estimated_time": int (minutes to complete),
+    "student_level": "Beginner/Intermediate/Advanced",
+    "tags": "comma-separated tags",
+    "correct_answer": "The correct answer",
+    "explanation": "Explanation of why this is correct",
+    "options": ["A. option1", "B. option2", "C. option3", "D. option4"] (for multiple choice only)
+}"""
 
-**Estimated Time:** {estimated_time} minutes
+def _format_generation_spec(
+    course_title: str,
+    chapter_title: str,
+    chapter_summary: str,
+    ilos: str,
+    num_questions: int,
+    difficulty_level: str,
+    question_types: List[str],
+    existing_questions: List[str]
+) -> str:
+    """Describe one set of questions to generate (context, examples and guidelines)."""
+    # Format example questions if any
+    examples_text = ""
+    if existing_questions:
+        examples_text = "Here are some example questions from this course:\n\n"
+        for i, q in enumerate(existing_questions[:3]):  # Limit to 3 examples
+            examples_text += f"Example {i+1}:\n{q}\n\n"
+    
+    return f"""
+        Create {num_questions} educational questions for:
+        
+        COURSE: {course_title}
+        CHAPTER: {chapter_title}
+        CHAPTER SUMMARY: {chapter_summary}
+        INTENDED LEARNING OUTCOMES (ILOs): {ilos}
+        
+        {examples_text}
+        
+        GUIDELINES:
+        1. Create {num_questions} unique questions with the following distribution:
+           - Difficulty: {difficulty_level}
+           - Question types: {', '.join(question_types)}
+        
+        2. Each question should:
+           - Directly align with the ILOs
+           - Be clearly worded and academically rigorous
+           - Include the correct answer and a brief explanation
+           - For multiple-choice questions, include 4 options with only one correct answer
+        """
 
-**Appropriate Student Level:** {student_level}
+# Fields a generated question must have to be kept
+_REQUIRED_QUESTION_FIELDS = frozenset(("question_content", "question_type", "difficulty", "correct_answer"))
 
-### Improvement Suggestions:
-{improvement_suggestions}
-"""
-                    
-                    return difficulty_rating, analysis_text
-            except Exception as nested_e:
-                logger.error(f"Failed to extract JSON using regex: {nested_e}")
-            
-            # If all parsing attempts fail, return the raw response as improvement suggestions
-            return 3.0, f"Analysis (raw): {response_text}"
+def _validate_generated_questions(questions: Any) -> List[Dict]:
+    """Drop incomplete questions from an LLM response and normalize the rest."""
+    if not isinstance(questions, list):
+        return []
+    
+    validated_questions = []
+    for q in questions:
+        # Ensure all required fields are present
+        if not isinstance(q, dict) or not _REQUIRED_QUESTION_FIELDS.issubset(q):
+            continue
         
-    except Exception as e:
-        logger.error(f"Error calling Groq API: {str(e)}")
-        return None, f"Error calling Groq API: {str(e)}"
+        try:
+            # Ensure difficulty is in range and estimated_time is an integer (default 5)
+            q["difficulty"] = max(1.0, min(5.0, float(q["difficulty"])))
+            q["estimated_time"] = int(q.setdefault("estimated_time", 5))
+        except (KeyError, TypeError, ValueError):
+            logger.warning(f"Skipping generated question with invalid fields: {q.get('question_content', '')[:50]}")
+            continue
+        
+        # Set default student_level if not present
+        q.setdefault("student_level", "Intermediate")
+        
+        validated_questions.append(q)
+    
+    return validated_questions
 
 def generate_questions(
     course_title: str,
@@ -259,11 +672,20 @@ def generate_questions(
     difficulty_level: str = "mixed",
     question_types: List[str] = ["Multiple Choice", "True/False", "Short Answer"],
     existing_questions: List[str] = [],
-    model: str = "llama-3.1-8b-instant"  # Default to LLaMA, can also use DeepSeek models
+    model: str = "llama-3.1-8b-instant",  # Default to LLaMA, can also use DeepSeek models
+    on_chunk_done: Optional[Callable[[int, int], None]] = None
 ) -> List[Dict]:
     """
     Generate questions for a chapter using Groq API with specified model
     
+    All num_questions questions (across all question_types) are produced by a single
+    API call, with the example questions sent once. If the response holds fewer
+    valid questions than requested, only the shortfall is requested again as chunked
+    concurrent calls; if the call fails outright, an empty list is returned.
+    To generate several differently configured sets at once, use generate_many
+    instead of calling this function in a loop; to split one large set across
+    concurrent calls from the start, use generate_questions_parallel.
+    
     Args:
         course_title: The title of the course
         chapter_title: The title of the chapter
@@ -274,6 +696,8 @@ def generate_questions(
         question_types: List of question types to generate
         existing_questions: List of existing questions as examples
         model: The model to use (e.g., "llama-3.1-8b-instant" or "deepseek-coder-instruct-6.7b")
+        on_chunk_done: Optional callback invoked as on_chunk_done(completed, total) after
+                       each shortfall chunk finishes (e.g. to update st.status)
         
     Returns:
         List of dictionaries with generated questions
@@ -284,111 +708,239 @@ def generate_questions(
         logger.error("Groq client not initialized. Cannot generate questions.")
         return []
     
+    questions = _generate_questions_with_client(
+        client, course_title, chapter_title, chapter_summary, ilos,
+        num_questions, difficulty_level, question_types, existing_questions, model
+    )
+    
+    # An empty result means the request failed (auth, rate limit, timeout, bad JSON);
+    # retrying it as several concurrent chunks would only repeat the failure
+    if not questions:
+        return []
+    
+    missing = num_questions - len(questions)
+    if missing > 0:
+        logger.warning(f"Received {len(questions)} of {num_questions} questions, requesting the remaining {missing} in chunks")
+        questions += _generate_in_chunks(
+            client, course_title, chapter_title, chapter_summary, ilos,
+            missing, difficulty_level, question_types, existing_questions, model,
+            on_chunk_done=on_chunk_done
+        )
+    
+    return questions[:num_questions]
+
+def _generate_questions_with_client(
+    client: Groq,
+    course_title: str,
+    chapter_title: str,
+    chapter_summary: str,
+    ilos: str,
+    num_questions: int,
+    difficulty_level: str,
+    question_types: List[str],
+    existing_questions: List[str],
+    model: str
+) -> List[Dict]:
+    """Issue a single generation request with an already resolved client."""
     try:
         # Construct the prompt
-        system_prompt = "You are an educational expert specialized in creating high-quality academic questions that assess understanding and critical thinking."
+        user_prompt = _format_generation_spec(
+            course_title, chapter_title, chapter_summary, ilos,
+            num_questions, difficulty_level, question_types, existing_questions
+        ) + f"""
+        Format each question as a JSON object with the following structure:
+        {_QUESTION_SCHEMA}
         
-        # Format example questions if any
-        examples_text = ""
-        if existing_questions:
-            examples_text = "Here are some example questions from this course:\n\n"
-            for i, q in enumerate(existing_questions[:3]):  # Limit to 3 examples
-                examples_text += f"Example {i+1}:\n{q}\n\n"
+        Return a JSON object of the form {{"questions": [...]}} where the array contains exactly {num_questions} question objects. The output should be valid parseable JSON.
+        """
         
-        user_prompt = f"""
-        Create {num_questions} educational questions for:
+        # Call the Groq API with specified model
+        logger.info(f"Using model: {model} to generate questions")
+        response_text = _stream_completion(
+            client,
+            messages=[
+                {"role": "system", "content": _GENERATION_SYSTEM_PROMPT},
+                {"role": "user", "content": user_prompt}
+            ],
+            model=model,
+            temperature=0.7,
+            max_tokens=_TOKENS_PER_QUESTION * num_questions + _TOKENS_OVERHEAD,
+            top_p=1,
+            stop=_STOP_SEQUENCES,
+            response_format={"type": "json_object"}  # Guarantee a valid JSON object
+        )
         
-        COURSE: {course_title}
-        CHAPTER: {chapter_title}
-        CHAPTER SUMMARY: {chapter_summary}
-        INTENDED LEARNING OUTCOMES (ILOs): {ilos}
+        logger.info(f"Received question generation response from Groq API using {model}")
         
-        {examples_text}
+        # The request uses JSON mode, so the response is a single JSON object
+        try:
+            questions = _loads_json_object(response_text).get("questions")
+            if not isinstance(questions, list):
+                logger.error("Could not find questions array in LLM response")
+                return []
+            
+            # Validate and clean up questions
+            return _validate_generated_questions(questions)
+        except json.JSONDecodeError as e:
+            logger.error(f"Failed to parse JSON from LLM response: {e}")
+            return []
         
-        GUIDELINES:
-        1. Create {num_questions} unique questions with the following distribution:
-           - Difficulty: {difficulty_level}
-           - Question types: {', '.join(question_types)}
+    except Exception as e:
+        logger.error(f"Error calling Groq API to generate questions: {str(e)}")
+        return []
+
+def generate_questions_parallel(
+    course_title: str,
+    chapter_title: str,
+    chapter_summary: str,
+    ilos: str,
+    num_questions: int = 3,
+    difficulty_level: str = "mixed",
+    question_types: List[str] = ["Multiple Choice", "True/False", "Short Answer"],
+    existing_questions: List[str] = [],
+    model: str = "llama-3.1-8b-instant",
+    chunk_size: int = _GENERATION_CHUNK_SIZE,
+    on_chunk_done: Optional[Callable[[int, int], None]] = None
+) -> List[Dict]:
+    """
+    Generate questions like generate_questions, but as several smaller concurrent calls
+    
+    num_questions is split into chunks of at most chunk_size questions, each requested
+    in its own API call on a thread pool, so latency is roughly that of one small call
+    instead of one long one. Chunks that fail contribute no questions.
+    
+    Args:
+        chunk_size: Maximum number of questions requested per API call
+        on_chunk_done: Optional callback invoked as on_chunk_done(completed, total) from
+                       the calling thread after each chunk finishes (e.g. to update st.status)
+        (remaining arguments as for generate_questions)
         
-        2. Each question should:
-           - Directly align with the ILOs
-           - Be clearly worded and academically rigorous
-           - Include the correct answer and a brief explanation
-           - For multiple-choice questions, include 4 options with only one correct answer
+    Returns:
+        List of dictionaries with generated questions, in chunk order
+    """
+    client = get_groq_client()
+    if not client:
+        logger.error("Groq client not initialized. Cannot generate questions.")
+        return []
+    
+    return _generate_in_chunks(
+        client, course_title, chapter_title, chapter_summary, ilos,
+        num_questions, difficulty_level, question_types, existing_questions, model,
+        chunk_size, on_chunk_done
+    )
+
+def _generate_in_chunks(
+    client: Groq,
+    course_title: str,
+    chapter_title: str,
+    chapter_summary: str,
+    ilos: str,
+    num_questions: int,
+    difficulty_level: str,
+    question_types: List[str],
+    existing_questions: List[str],
+    model: str,
+    chunk_size: int = _GENERATION_CHUNK_SIZE,
+    on_chunk_done: Optional[Callable[[int, int], None]] = None
+) -> List[Dict]:
+    """Request num_questions as concurrent chunks of at most chunk_size questions each."""
+    chunk_size = max(1, chunk_size)
+    chunks = [min(chunk_size, num_questions - start) for start in range(0, num_questions, chunk_size)]
+    results: List[List[Dict]] = [[] for _ in chunks]
+    
+    # The calls are I/O-bound, so threads overlap them; the pool size caps the
+    # number of in-flight requests against the provider's rate limit
+    with ThreadPoolExecutor(max_workers=min(_GENERATION_WORKERS, len(chunks) or 1)) as executor:
+        futures = {
+            executor.submit(
+                _generate_questions_with_client,
+                client, course_title, chapter_title, chapter_summary, ilos,
+                count, difficulty_level, question_types, existing_questions, model
+            ): i
+            for i, count in enumerate(chunks)
+        }
+        for completed, future in enumerate(as_completed(futures), start=1):
+            results[futures[future]] = future.result()
+            if on_chunk_done:
+                on_chunk_done(completed, len(chunks))
+    
+    return [question for chunk in results for question in chunk]
+
+def generate_many(
+    specs: List[Dict[str, Any]],
+    model: str = "llama-3.1-8b-instant"
+) -> Dict[str, List[Dict]]:
+    """
+    Generate several independent sets of questions with a single Groq API call.
+    
+    Args:
+        specs: List of dicts, each with an "id" key plus the generate_questions arguments
+               (course_title, chapter_title, chapter_summary, ilos, and optionally
+               num_questions, difficulty_level, question_types, existing_questions)
+        model: The model to use for all specs
         
+    Returns:
+        Dictionary mapping each spec id to its list of generated questions
+    """
+    results = {str(spec["id"]): [] for spec in specs}
+    if not specs:
+        return results
+    
+    # Get client for this request
+    client = get_groq_client()
+    if not client:
+        logger.error("Groq client not initialized. Cannot generate questions.")
+        return results
+    
+    try:
+        # One prompt with a section per spec, answered as an object keyed by spec id
+        sections = []
+        for spec in specs:
+            sections.append(f"SPEC ID: {spec['id']}" + _format_generation_spec(
+                spec["course_title"],
+                spec["chapter_title"],
+                spec.get("chapter_summary", ""),
+                spec.get("ilos", ""),
+                spec.get("num_questions", 3),
+                spec.get("difficulty_level", "mixed"),
+                spec.get("question_types", ["Multiple Choice", "True/False", "Short Answer"]),
+                spec.get("existing_questions", [])
+            ))
+        
+        total_questions = sum(spec.get("num_questions", 3) for spec in specs)
+        user_prompt = "\n".join(sections) + f"""
         Format each question as a JSON object with the following structure:
-        {{
-            "question_content": "The full question text",
-            "question_type": "Multiple Choice/True/False/Short Answer/Essay",
-            "difficulty": float (1.0-5.0 where 1=easiest, 5=hardest),
-            "estimated_time": int (minutes to complete),
-            "student_level": "Beginner/Intermediate/Advanced",
-            "tags": "comma-separated tags",
-            "correct_answer": "The correct answer",
-            "explanation": "Explanation of why this is correct",
-            "options": ["A. option1", "B. option2", "C. option3", "D. option4"] (for multiple choice only)
-        }}
+        {_QUESTION_SCHEMA}
         
-        Return a JSON array of question objects. The output should be valid parseable JSON.
+        Return a single JSON object whose keys are the SPEC IDs above and whose values are the arrays of question objects for that spec. The output should be valid parseable JSON.
         """
         
-        # Call the Groq API with specified model
-        logger.info(f"Using model: {model} to generate questions")
-        response = client.chat.completions.create(
+        logger.info(f"Using model: {model} to generate questions for {len(specs)} specs")
+        response_text = _stream_completion(
+            client,
             messages=[
-                {"role": "system", "content": system_prompt},
+                {"role": "system", "content": _GENERATION_SYSTEM_PROMPT},
                 {"role": "user", "content": user_prompt}
             ],
             model=model,
             temperature=0.7,
-            max_tokens=2048,
+            max_tokens=_TOKENS_PER_QUESTION * total_questions + _TOKENS_OVERHEAD * len(specs),
             top_p=1,
-            stream=False
+            stop=_STOP_SEQUENCES,
+            response_format={"type": "json_object"}  # Guarantee a valid JSON object
         )
         
-        # Extract and parse the response
-        response_text = response.choices[0].message.content
-        logger.info(f"Received question generation response from Groq API using {model}")
-        
-        # Try to extract JSON from the response
         try:
-            # Look for JSON pattern in the response
-            import re
-            json_match = re.search(r'\[.*\]', response_text, re.DOTALL)
-            if json_match:
-                json_str = json_match.group(0)
-                questions = json.loads(json_str)
-                
-                # Validate and clean up questions
-                validated_questions = []
-                for q in questions:
-                    # Ensure all required fields are present
-                    if not all(k in q for k in ["question_content", "question_type", "difficulty", "correct_answer"]):
-                        continue
-                    
-                    # Ensure difficulty is in range
-                    q["difficulty"] = max(1.0, min(5.0, float(q["difficulty"])))
-                    
-                    # Ensure estimated_time is an integer
-                    if "estimated_time" in q:
-                        q["estimated_time"] = int(q["estimated_time"])
-                    else:
-                        q["estimated_time"] = 5  # Default
-                    
-                    # Set default student_level if not present
-                    if "student_level" not in q:
-                        q["student_level"] = "Intermediate"
-                    
-                    validated_questions.append(q)
-                
-                return validated_questions
-            else:
-                logger.error("Could not find JSON array in LLM response")
-                return []
+            generated = _loads_json_object(response_text)
         except json.JSONDecodeError as e:
             logger.error(f"Failed to parse JSON from LLM response: {e}")
-            return []
+            return results
+        
+        for spec_id in results:
+            results[spec_id] = _validate_generated_questions(generated.get(spec_id))
+        
+        return results
         
     except Exception as e:
         logger.error(f"Error calling Groq API to generate questions: {str(e)}")
-        return []
\ No newline at end of file
+        return results
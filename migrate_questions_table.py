@@ -1,10 +1,9 @@
 from database import get_db
+from utils import DIFFICULTY_THRESHOLDS, DIFFICULTY_LABELS
 import logging
 import sqlalchemy as sa
 from sqlalchemy import Column, Integer, ForeignKey
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 def add_created_by_column():
@@ -37,5 +36,88 @@ def add_created_by_column():
         logger.error(f"Error adding created_by column: {str(e)}")
         raise
 
+def add_difficulty_label_column():
+    """Add difficulty_label column to questions table and backfill it from difficulty"""
+    logger.info("Adding difficulty_label column to questions table...")
+    
+    try:
+        # Get database connection
+        db = next(get_db())
+        
+        # Check if difficulty_label column exists
+        inspector = sa.inspect(db.bind)
+        columns = [col['name'] for col in inspector.get_columns('questions')]
+        
+        with db.bind.connect() as conn:
+            if 'difficulty_label' not in columns:
+                logger.info("'difficulty_label' column does not exist, adding it now...")
+                conn.execute(sa.text(
+                    "ALTER TABLE questions ADD COLUMN difficulty_label VARCHAR(10)"
+                ))
+            else:
+                logger.info("'difficulty_label' column already exists")
+            
+            # Same bands as utils.difficulty_label: each threshold is the inclusive
+            # upper bound of its band
+            bands = " ".join(
+                f"WHEN difficulty <= :bound_{i} THEN :label_{i}"
+                for i in range(len(DIFFICULTY_THRESHOLDS))
+            )
+            params = {f"bound_{i}": bound for i, bound in enumerate(DIFFICULTY_THRESHOLDS)}
+            params.update({f"label_{i}": label for i, label in enumerate(DIFFICULTY_LABELS)})
+            result = conn.execute(sa.text(
+                f"UPDATE questions SET difficulty_label = CASE {bands} ELSE :label_{len(DIFFICULTY_THRESHOLDS)} END "
+                "WHERE difficulty_label IS NULL AND difficulty IS NOT NULL"
+            ), params)
+            conn.commit()
+            
+        logger.info(f"Backfilled difficulty_label for {result.rowcount} questions")
+            
+    except Exception as e:
+        logger.error(f"Error adding difficulty_label column: {str(e)}")
+        raise
+
+# Indexes on the questions table used by filters/joins; names follow SQLAlchemy's
+# ix_<table>_<column> convention so they match the ones declared in models.py
+QUESTION_INDEXES = {
+    "ix_questions_created_by": "created_by",
+    "ix_questions_chapter_id": "chapter_id",
+    "ix_questions_question_type": "question_type",
+}
+
+def add_question_indexes():
+    """Create missing indexes on the questions table"""
+    logger.info("Adding indexes to questions table...")
+    
+    try:
+        # Get database connection
+        db = next(get_db())
+        
+        # On PostgreSQL build the indexes concurrently so writers are not blocked;
+        # CONCURRENTLY cannot run inside a transaction, hence AUTOCOMMIT
+        is_postgres = db.bind.dialect.name == "postgresql"
+        concurrently = "CONCURRENTLY " if is_postgres else ""
+        
+        with db.bind.connect() as conn:
+            if is_postgres:
+                conn = conn.execution_options(isolation_level="AUTOCOMMIT")
+            
+            for index_name, column in QUESTION_INDEXES.items():
+                conn.execute(sa.text(
+                    f"CREATE INDEX {concurrently}IF NOT EXISTS {index_name} ON questions ({column})"
+                ))
+                logger.info(f"Index '{index_name}' is in place")
+            
+            if not is_postgres:
+                conn.commit()
+            
+    except Exception as e:
+        logger.error(f"Error adding indexes to questions table: {str(e)}")
+        raise
+
 if __name__ == "__main__":
-    add_created_by_column()
\ No newline at end of file
+    # Configure logging when run as a standalone script
+    logging.basicConfig(level=logging.INFO)
+    add_created_by_column()
+    add_difficulty_label_column()
+    add_question_indexes()
\ No newline at end of file
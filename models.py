@@ -1,10 +1,14 @@
 from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, Text, Boolean
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship, backref
-from datetime import datetime
+from datetime import datetime, timezone
 
 Base = declarative_base()
 
+def utcnow() -> datetime:
+    """Current UTC time as a naive datetime (replacement for the deprecated datetime.utcnow)."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
 class User(Base):
     __tablename__ = "users"
     
@@ -13,8 +17,8 @@ class User(Base):
     email = Column(String(100), unique=True, index=True, nullable=False)
     password = Column(String(255), nullable=False)  # Hashed password
     salt = Column(String(255), nullable=False)  # Salt for password hashing
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(DateTime, default=utcnow)
+    updated_at = Column(DateTime, default=utcnow, onupdate=utcnow)
     last_login = Column(DateTime)
     
     # Add these relationships
@@ -28,8 +32,8 @@ class Role(Base):
     id = Column(Integer, primary_key=True)
     name = Column(String(50), unique=True)
     permissions = Column(Text)  # JSON string of permissions
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(DateTime, default=utcnow)
+    updated_at = Column(DateTime, default=utcnow, onupdate=utcnow)
     
     users = relationship("UserRole", back_populates="role", cascade="all, delete-orphan")
 
@@ -38,7 +42,7 @@ class UserRole(Base):
     
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
     role_id = Column(Integer, ForeignKey("roles.id", ondelete="CASCADE"), primary_key=True)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=utcnow)
     
     user = relationship("User", back_populates="roles")
     role = relationship("Role", back_populates="users")
@@ -49,8 +53,8 @@ class Course(Base):
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(100), nullable=False)
     description = Column(Text)
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(DateTime, default=utcnow)
+    updated_at = Column(DateTime, default=utcnow, onupdate=utcnow)
     created_by = Column(Integer, ForeignKey("users.id"))
     
     chapters = relationship("Chapter", back_populates="course", cascade="all, delete-orphan")
@@ -64,8 +68,8 @@ class Chapter(Base):
     title = Column(String(100), nullable=False)
     summary = Column(Text)
     ilos = Column(Text)  # Intended Learning Outcomes
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(DateTime, default=utcnow)
+    updated_at = Column(DateTime, default=utcnow, onupdate=utcnow)
     
     course = relationship("Course", back_populates="chapters")
     questions = relationship("Question", back_populates="chapter", cascade="all, delete-orphan")
@@ -74,18 +78,19 @@ class Question(Base):
     __tablename__ = "questions"
     
     id = Column(Integer, primary_key=True, index=True)
-    chapter_id = Column(Integer, ForeignKey("chapters.id", ondelete="CASCADE"))
+    chapter_id = Column(Integer, ForeignKey("chapters.id", ondelete="CASCADE"), index=True)
     content = Column(Text, nullable=False)
     difficulty = Column(Float)  # 1-5 scale
+    difficulty_label = Column(String(10))  # Easy, Medium, Hard; derived from difficulty on write
     estimated_time = Column(Integer)  # in minutes
     student_level = Column(String(20))  # Beginner, Intermediate, Advanced
     tags = Column(String(255))  # Comma-separated tags
-    question_type = Column(String(50))  # Multiple Choice, Essay, etc.
+    question_type = Column(String(50), index=True)  # Multiple Choice, Essay, etc.
     correct_answer = Column(Text)
     explanation = Column(Text)  # Explanation for the correct answer
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
-    created_by = Column(Integer, ForeignKey("users.id"))  # Track who created the question
+    created_at = Column(DateTime, default=utcnow)
+    updated_at = Column(DateTime, default=utcnow, onupdate=utcnow)
+    created_by = Column(Integer, ForeignKey("users.id"), index=True)  # Track who created the question
     
     chapter = relationship("Chapter", back_populates="questions")
     feedback = relationship("StudentFeedback", back_populates="question", cascade="all, delete-orphan")
@@ -101,7 +106,7 @@ class StudentFeedback(Base):
     difficulty_rating = Column(Float)
     student_gpa = Column(Float)
     attendance_rate = Column(Float)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=utcnow)
     user_id = Column(Integer, ForeignKey("users.id"))
     
     question = relationship("Question", back_populates="feedback")
@@ -115,7 +120,7 @@ class StudentProgress(Base):
     question_id = Column(Integer, ForeignKey("questions.id", ondelete="CASCADE"))
     attempts = Column(Integer, default=0)
     correct = Column(Boolean, default=False)
-    last_attempt_date = Column(DateTime, default=datetime.utcnow)
+    last_attempt_date = Column(DateTime, default=utcnow)
     
     user = relationship("User", back_populates="progress")
     question = relationship("Question", back_populates="student_progress")
@@ -128,8 +133,8 @@ class Discussion(Base):
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"))
     parent_id = Column(Integer, ForeignKey("discussions.id", ondelete="CASCADE"), nullable=True)
     content = Column(Text, nullable=False)
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(DateTime, default=utcnow)
+    updated_at = Column(DateTime, default=utcnow, onupdate=utcnow)
     
     question = relationship("Question", back_populates="discussions")
     user = relationship("User", back_populates="discussions")
@@ -147,8 +152,8 @@ class Exam(Base):
     created_by = Column(Integer, ForeignKey("users.id"))
     time_limit = Column(Integer)  # in minutes
     total_points = Column(Integer)
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(DateTime, default=utcnow)
+    updated_at = Column(DateTime, default=utcnow, onupdate=utcnow)
     
     course = relationship("Course")
     creator = relationship("User", foreign_keys=[created_by])
@@ -162,7 +167,7 @@ class ExamQuestion(Base):
     question_id = Column(Integer, ForeignKey("questions.id", ondelete="CASCADE"))
     order = Column(Integer, nullable=False)  # Order in which questions appear
     points = Column(Integer, nullable=False, default=1)  # Points for this question
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=utcnow)
     
     exam = relationship("Exam", back_populates="exam_questions")
     question = relationship("Question")
@@ -1,12 +1,12 @@
 import streamlit as st
 from database import get_db
 from models import Course, Chapter, Question
-from utils import show_success, show_error
-from datetime import datetime
+from utils import (
+    show_success, show_error, difficulty_label, load_course_options, load_chapter_options,
+    count_exam_questions, load_exam_page, clear_question_caches, clear_course_caches
+)
 import logging
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 def add_course():
@@ -30,13 +30,12 @@ def add_course():
             new_course = Course(
                 title=title,
                 description=description,
-                created_at=datetime.utcnow(),
-                updated_at=datetime.utcnow(),
                 created_by=st.session_state.user["id"]
             )
             
             db.add(new_course)
             db.commit()
+            clear_course_caches()
             
             show_success(f"Course '{title}' added successfully!")
             
@@ -52,8 +51,7 @@ def add_chapter():
     """Function to add a new chapter."""
     st.subheader("Add New Chapter")
     
-    db = next(get_db())
-    courses = db.query(Course).all()
+    courses = load_course_options()
     
     if not courses:
         st.info("No courses available yet. You can add a course using the form below.")
@@ -62,7 +60,7 @@ def add_chapter():
     with st.form("add_chapter_form"):
         course_id = st.selectbox(
             "Select Course",
-            options=[(c.id, c.title) for c in courses],
+            options=courses,
             format_func=lambda x: x[1]
         )
         
@@ -78,18 +76,19 @@ def add_chapter():
             return
             
         try:
+            db = next(get_db())
+            
             # Create new chapter
             new_chapter = Chapter(
                 course_id=course_id[0],
                 title=title,
                 summary=summary,
-                ilos=ilos,
-                created_at=datetime.utcnow(),
-                updated_at=datetime.utcnow()
+                ilos=ilos
             )
             
             db.add(new_chapter)
             db.commit()
+            clear_course_caches()
             
             show_success(f"Chapter '{title}' added successfully!")
             
@@ -105,8 +104,7 @@ def add_question():
     """Function to add a new question."""
     st.subheader("Add New Question")
     
-    db = next(get_db())
-    chapters = db.query(Chapter).join(Course).all()
+    chapters = load_chapter_options()
     
     if not chapters:
         st.warning("No chapters available. Please add a chapter first.")
@@ -115,7 +113,7 @@ def add_question():
     with st.form("add_question_form"):
         chapter_id = st.selectbox(
             "Select Chapter",
-            options=[(c.id, f"{c.course.title} - {c.title}") for c in chapters],
+            options=chapters,
             format_func=lambda x: x[1]
         )
         
@@ -143,25 +141,29 @@ def add_question():
             return
             
         try:
+            db = next(get_db())
+            
             # Create new question
             new_question = Question(
                 chapter_id=chapter_id[0],
                 content=content,
                 difficulty=difficulty,
+                difficulty_label=difficulty_label(difficulty),
                 estimated_time=estimated_time,
                 student_level=student_level,
                 tags=tags,
                 question_type=question_type,
                 correct_answer=correct_answer,
                 explanation=explanation,
-                created_at=datetime.utcnow(),
-                updated_at=datetime.utcnow(),
                 created_by=st.session_state.user["id"]  # Track who created the question
             )
             
             db.add(new_question)
             db.commit()
             
+            # Make the new question visible in the exam view right away
+            clear_question_caches()
+            
             show_success("Question added successfully!")
             
             # Clear form without full page refresh
@@ -172,25 +174,17 @@ def add_question():
             logger.error(f"Error adding question: {str(e)}")
             show_error(f"Error adding question: {str(e)}")
 
+# Number of questions shown per page in view_exams
+EXAM_QUESTIONS_PER_PAGE = 20
+
 def view_exams():
     """Function to view all exams in a complete format."""
     st.subheader("View Complete Exams")
     
     try:
-        db = next(get_db())
-        
-        # Get all questions with related data
-        questions_data = db.query(
-            Question, 
-            Chapter.title.label("chapter_title"), 
-            Course.title.label("course_title")
-        ).join(
-            Chapter, Question.chapter_id == Chapter.id
-        ).join(
-            Course, Chapter.course_id == Course.id
-        ).all()
+        total_questions = count_exam_questions()
         
-        if not questions_data:
+        if not total_questions:
             st.info("No questions available in the database.")
             return
         
@@ -198,34 +192,39 @@ def view_exams():
         st.markdown("### Complete Exam View")
         st.markdown("This view displays all questions in a complete exam format.")
         
-        for i, (question, chapter_title, course_title) in enumerate(questions_data):
+        # Only the selected page is fetched and rendered
+        total_pages = (total_questions + EXAM_QUESTIONS_PER_PAGE - 1) // EXAM_QUESTIONS_PER_PAGE
+        page = st.number_input(
+            f"Page (1-{total_pages})",
+            min_value=1,
+            max_value=total_pages,
+            value=1,
+            step=1,
+            key="view_exams_page"
+        )
+        start = (page - 1) * EXAM_QUESTIONS_PER_PAGE
+        
+        for i, question in enumerate(load_exam_page(page, EXAM_QUESTIONS_PER_PAGE), start=start):
             # Create a card-like container for each question
             with st.container():
                 st.markdown(f"### Question {i+1}")
                 
                 # Display question content
-                st.markdown(f"**{question.content}**")
-                
-                # Display difficulty level in a human-readable format
-                difficulty_text = "Easy"
-                if question.difficulty > 2.5 and question.difficulty <= 3.5:
-                    difficulty_text = "Medium"
-                elif question.difficulty > 3.5:
-                    difficulty_text = "Hard"
+                st.markdown(f"**{question['content']}**")
                 
                 # Display metadata in columns
                 col1, col2, col3 = st.columns(3)
                 with col1:
-                    st.markdown(f"**Difficulty:** {difficulty_text} ({question.difficulty}/5.0)")
+                    st.markdown(f"**Difficulty:** {question['difficulty_text']} ({question['difficulty']}/5.0)")
                 with col2:
-                    st.markdown(f"**Time:** {question.estimated_time} minutes")
+                    st.markdown(f"**Time:** {question['estimated_time']} minutes")
                 with col3:
-                    st.markdown(f"**Type:** {question.question_type}")
+                    st.markdown(f"**Type:** {question['question_type']}")
                 
                 # For multiple choice questions, display options
-                if question.question_type == "Multiple Choice" and "|" in question.correct_answer:
+                if question["question_type"] == "Multiple Choice" and "|" in question["correct_answer"]:
                     # Parse options from the correct_answer field
-                    parts = question.correct_answer.split("|")
+                    parts = question["correct_answer"].split("|")
                     correct_answer = parts[0]
                     options = parts[1:] if len(parts) > 1 else []
                     
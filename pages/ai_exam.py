@@ -1,6 +1,5 @@
 import streamlit as st
-import pandas as pd
-from database import get_db
+from database import get_session_factory
 from models import Question, Chapter, Course, User
 import logging
 
@@ -8,77 +7,124 @@ import logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Page size choices for the question list
+PAGE_SIZES = [10, 20, 50]
+
+def _questions_query(db):
+    """Columns the page renders (plain rows, no ORM entities) for all questions with a creator."""
+    return db.query(
+        Question.id,
+        Question.content,
+        Question.difficulty,
+        Question.difficulty_label.label("difficulty_text"),
+        Question.estimated_time,
+        Question.question_type,
+        Question.correct_answer,
+        Chapter.title.label("chapter_title"), 
+        Course.title.label("course_title"),
+        User.username.label("creator_name")
+    ).join(
+        Chapter, Question.chapter_id == Chapter.id
+    ).join(
+        Course, Chapter.course_id == Course.id
+    ).join(
+        User, Question.created_by == User.id
+    )
+
 def show_ai_exam():
     """Display all AI-generated questions in a simple exam format."""
     st.markdown("## AI Exam Questions")
     st.markdown("This page displays all questions created with the AI Question Generator in a simple exam format.")
     
+    _render_questions()
+
+@st.fragment
+def _render_questions():
+    """Render one page of questions; paging reruns only this fragment, not the whole page."""
+    db = get_session_factory()()
     try:
-        db = next(get_db())
+        total_questions = _questions_query(db).count()
         
-        # Get all questions with related data including creator
-        questions_data = db.query(
-            Question, 
-            Chapter.title.label("chapter_title"), 
-            Course.title.label("course_title"),
-            User.username.label("creator_name")
-        ).join(
-            Chapter, Question.chapter_id == Chapter.id
-        ).join(
-            Course, Chapter.course_id == Course.id
-        ).join(
-            User, Question.created_by == User.id
-        ).all()
-        
-        if not questions_data:
+        if not total_questions:
             st.info("No questions available in the database.")
             return
         
-        # Display questions in a simple exam format
-        for i, (question, chapter_title, course_title, creator_name) in enumerate(questions_data):
-            # Create a card-like container for each question
-            with st.container():
-                st.markdown(f"### Question {i+1}")
-                
-                # Display question content
-                st.markdown(f"**{question.content}**")
-                
-                # Display difficulty level in a human-readable format
-                difficulty_text = "Easy"
-                if question.difficulty > 2.5 and question.difficulty <= 3.5:
-                    difficulty_text = "Medium"
-                elif question.difficulty > 3.5:
-                    difficulty_text = "Hard"
-                
-                # Display metadata in columns
-                col1, col2, col3, col4 = st.columns(4)
-                with col1:
-                    st.markdown(f"**Difficulty:** {difficulty_text} ({question.difficulty}/5.0)")
-                with col2:
-                    st.markdown(f"**Time:** {question.estimated_time} minutes")
-                with col3:
-                    st.markdown(f"**Type:** {question.question_type}")
-                with col4:
-                    st.markdown(f"**Created by:** {creator_name}")
-                
-                # For multiple choice questions, display options
-                if question.question_type == "Multiple Choice" and "|" in question.correct_answer:
-                    # Parse options from the correct_answer field
-                    parts = question.correct_answer.split("|")
-                    correct_answer = parts[0]
-                    options = parts[1:] if len(parts) > 1 else []
-                    
+        # Pagination controls
+        col1, col2 = st.columns([1, 3])
+        with col1:
+            page_size = st.selectbox("Questions per page", options=PAGE_SIZES, index=1, key="ai_exam_page_size")
+        total_pages = (total_questions + page_size - 1) // page_size
+        with col2:
+            page = st.number_input(
+                f"Page (1-{total_pages})",
+                min_value=1,
+                max_value=total_pages,
+                value=1,
+                step=1,
+                key="ai_exam_page"
+            )
+        start = (page - 1) * page_size
+        
+        # Only the selected page is fetched, streamed from the database in batches
+        questions_data = _questions_query(db).order_by(Question.id).limit(page_size).offset(start).execution_options(yield_per=200).all()
+        
+        import pandas as pd  # Imported lazily; only the rendered list needs it
+        
+        # Difficulty labels are stored on the question at write time
+        df = pd.DataFrame(questions_data, columns=[
+            "id", "content", "difficulty", "difficulty_text", "estimated_time", "question_type",
+            "correct_answer", "chapter_title", "course_title", "creator_name"
+        ])
+        
+        df["number"] = range(start + 1, start + len(df) + 1)
+        
+        # One table for the page's metadata instead of a column layout per question
+        summary = df[["number", "difficulty_text", "difficulty", "estimated_time", "question_type", "creator_name"]].rename(columns={
+            "number": "Question",
+            "difficulty_text": "Difficulty",
+            "difficulty": "Rating",
+            "estimated_time": "Time (min)",
+            "question_type": "Type",
+            "creator_name": "Created by"
+        })
+        st.dataframe(summary, use_container_width=True, hide_index=True)
+        
+        # Full content is rendered for the selected question only
+        selected = st.selectbox(
+            "Show question",
+            options=range(len(df)),
+            format_func=lambda row: f"Question {start + row + 1}: {df.at[row, 'content'][:80]}",
+            key="ai_exam_selected"
+        )
+        question = df.iloc[selected]
+        
+        with st.container():
+            st.markdown(f"### Question {question.number}")
+            
+            # Display question content
+            st.markdown(f"**{question.content}**")
+            st.markdown(
+                f"**Difficulty:** {question.difficulty_text} ({question.difficulty}/5.0) · "
+                f"**Time:** {question.estimated_time} minutes · "
+                f"**Type:** {question.question_type} · "
+                f"**Created by:** {question.creator_name}"
+            )
+            
+            # For multiple choice questions, display options
+            if question.question_type == "Multiple Choice":
+                # Parse options from the correct_answer field (correct_answer|option1|option2|...)
+                correct_answer, sep, options_str = question.correct_answer.partition("|")
+                if sep:
                     # Display options
                     st.markdown("**Options:**")
-                    for option in options:
+                    for option in options_str.split("|"):
                         st.markdown(f"- {option}")
-                
-                # Add a separator between questions
-                st.markdown("---")
     
     except Exception as e:
         logger.error(f"Error displaying AI exam: {str(e)}")
         st.error(f"Error loading questions: {str(e)}")
+    finally:
+        db.close()
 
 # For backward compatibility - this will be called when the file is run directly
 if __name__ == "__main__":
@@ -1,18 +1,40 @@
 import streamlit as st
-import pandas as pd
-from database import get_db
-from models import Course, Chapter, Question
-from datetime import datetime
 import logging
-from utils import show_success, show_error, rerun
+from utils import show_success, show_error, rerun, load_course_catalog, add_questions_bulk
 from llm_utils import generate_questions
-import json
-import random
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+@st.cache_data(ttl=600, max_entries=64, show_spinner=False)
+def _generate_questions_cached(
+    course_title, chapter_title, chapter_summary, ilos,
+    num_questions, difficulty_level, question_types, existing_questions, model,
+    nonce=0, _on_chunk_done=None
+):
+    """
+    Memoize generation for identical settings; the progress callback is not part of the key.
+    
+    Bumping nonce requests a fresh set for the same settings instead of the cached one.
+    """
+    questions = generate_questions(
+        course_title=course_title,
+        chapter_title=chapter_title,
+        chapter_summary=chapter_summary,
+        ilos=ilos,
+        num_questions=num_questions,
+        difficulty_level=difficulty_level,
+        question_types=list(question_types),
+        existing_questions=list(existing_questions),
+        model=model,
+        on_chunk_done=_on_chunk_done
+    )
+    if not questions:
+        # Raising keeps a failed generation out of the cache so it can be retried
+        raise RuntimeError("Failed to generate questions. Please try again.")
+    return questions
+
 def show_bulk_question_generator():
     """Display the bulk question generator page."""
     st.markdown("## AI Bulk Question Generator")
@@ -23,7 +45,7 @@ def show_bulk_question_generator():
         st.session_state.bulk_generator = {
             "generated_questions": [],
             "form_submitted": False,
-            "selected_questions": [],
+            "selected_questions": set(),
             "generation_complete": False
         }
     
@@ -33,12 +55,9 @@ def show_bulk_question_generator():
         st.rerun()
     
     try:
-        db = next(get_db())
+        catalog = load_course_catalog()
         
-        # Get all courses
-        courses = db.query(Course).all()
-        
-        if not courses:
+        if not catalog:
             st.info("No courses available yet. You can add courses from the 'Add' tab.")
             st.markdown("### Please add courses to use the AI Bulk Question Generator")
             return
@@ -46,13 +65,14 @@ def show_bulk_question_generator():
         # Course selection
         selected_course_id = st.selectbox(
             "Select Course",
-            options=[(c.id, c.title) for c in courses],
+            options=[(course_id, course["title"]) for course_id, course in catalog.items()],
             format_func=lambda x: x[1],
             key="bulk_course"
         )
+        selected_course = catalog[selected_course_id[0]]
         
         # Get chapters for the selected course
-        chapters = db.query(Chapter).filter_by(course_id=selected_course_id[0]).all()
+        chapters = selected_course["chapters"]
         
         if not chapters:
             st.warning(f"No chapters available for the selected course. Please add a chapter first.")
@@ -61,14 +81,13 @@ def show_bulk_question_generator():
         # Chapter selection
         selected_chapter_id = st.selectbox(
             "Select Chapter",
-            options=[(c.id, c.title) for c in chapters],
+            options=[(chapter_id, chapter["title"]) for chapter_id, chapter in chapters.items()],
             format_func=lambda x: x[1],
             key="bulk_chapter"
         )
         
-        # Get the selected chapter and course
-        selected_chapter = db.query(Chapter).get(selected_chapter_id[0])
-        selected_course = db.query(Course).get(selected_course_id[0])
+        # Get the selected chapter
+        selected_chapter = chapters.get(selected_chapter_id[0])
         
         if not selected_chapter:
             st.warning("Selected chapter not found.")
@@ -114,31 +133,46 @@ def show_bulk_question_generator():
                 help="Select the AI model to use for generation"
             )
         
-        # Get existing questions for the chapter as examples
-        existing_questions = []
-        chapter_questions = db.query(Question).filter_by(chapter_id=selected_chapter_id[0]).limit(3).all()
-        for q in chapter_questions:
-            existing_questions.append(q.content)
+        # Existing questions for the chapter are used as examples
+        existing_questions = selected_chapter["examples"]
         
-        # Generate button
-        if st.button("Generate Questions"):
+        # Generate buttons; Regenerate bypasses the cached set for the same settings
+        generate_col, regenerate_col = st.columns(2)
+        with generate_col:
+            generate = st.button("Generate Questions")
+        with regenerate_col:
+            regenerate = st.button(
+                "Regenerate",
+                disabled=not st.session_state.bulk_generator["generation_complete"],
+                help="Generate a new set of questions instead of reusing the previous result"
+            )
+        if regenerate:
+            st.session_state.bulk_generation_nonce = st.session_state.get("bulk_generation_nonce", 0) + 1
+        
+        if generate or regenerate:
             if not question_types:
                 show_error("Please select at least one question type.")
                 return
                 
             try:
                 # Call the AI to generate questions
-                with st.spinner(f"AI is generating {num_questions} questions... This may take a moment."):
-                    generated_questions = generate_questions(
-                        course_title=selected_course.title,
-                        chapter_title=selected_chapter.title,
-                        chapter_summary=selected_chapter.summary or "",
-                        ilos=selected_chapter.ilos or "",
-                        num_questions=num_questions,
-                        difficulty_level=difficulty_level,
-                        question_types=question_types,
-                        existing_questions=existing_questions,
-                        model=model
+                with st.status(f"AI is generating {num_questions} questions... This may take a moment.") as status:
+                    # Only called if the first response falls short and the rest is fetched in batches
+                    def report_progress(completed, total):
+                        status.update(label=f"Generated {completed} of {total} follow-up question batches...")
+                    
+                    generated_questions = _generate_questions_cached(
+                        selected_course["title"],
+                        selected_chapter["title"],
+                        selected_chapter["summary"] or "",
+                        selected_chapter["ilos"] or "",
+                        num_questions,
+                        difficulty_level,
+                        tuple(question_types),
+                        tuple(existing_questions),
+                        model,
+                        nonce=st.session_state.get("bulk_generation_nonce", 0),
+                        _on_chunk_done=report_progress
                     )
                     
                     if not generated_questions:
@@ -147,6 +181,7 @@ def show_bulk_question_generator():
                     
                     # Store generated questions in session state
                     st.session_state.bulk_generator["generated_questions"] = generated_questions
+                    st.session_state.pop("bulk_save_selection", None)
                     st.session_state.bulk_generator["generation_complete"] = True
                     
                     # Show success message
@@ -186,80 +221,90 @@ def display_generated_questions(chapter_id):
             "Level": q.get("student_level", "Intermediate")
         })
     
+    # Choose which questions to save
+    selected = st.multiselect(
+        "Questions to save",
+        options=list(range(len(generated_questions))),
+        default=list(range(len(generated_questions))),
+        format_func=lambda i: f"Question {i+1}",
+        key="bulk_save_selection"
+    )
+    st.session_state.bulk_generator["selected_questions"] = set(selected)
+    
+    import pandas as pd  # Imported lazily; only this view needs it
+    
     df = pd.DataFrame(questions_data)
     st.dataframe(df, use_container_width=True)
     
-    # Display each question in an expander
-    for i, question in enumerate(generated_questions):
-        with st.expander(f"Question {i+1}: {question['question_content'][:100]}...", expanded=False):
-            st.markdown(f"**Question Content:** {question['question_content']}")
-            st.markdown(f"**Question Type:** {question['question_type']}")
-            st.markdown(f"**Difficulty:** {question['difficulty']}/5.0")
-            st.markdown(f"**Estimated Time:** {question.get('estimated_time', 5)} minutes")
-            st.markdown(f"**Student Level:** {question.get('student_level', 'Intermediate')}")
-            
-            if "tags" in question and question["tags"]:
-                st.markdown(f"**Tags:** {question['tags']}")
-                
-            st.markdown(f"**Correct Answer:** {question['correct_answer']}")
-            st.markdown(f"**Explanation:** {question['explanation']}")
-            
-            if question['question_type'] == "Multiple Choice" and "options" in question:
-                st.markdown("**Options:**")
-                for option in question["options"]:
-                    st.markdown(f"- {option}")
-            
-            # Checkbox to select this question for saving
-            if st.checkbox("Save this question", key=f"save_q_{i}", value=True):
-                if i not in st.session_state.bulk_generator["selected_questions"]:
-                    st.session_state.bulk_generator["selected_questions"].append(i)
-            else:
-                if i in st.session_state.bulk_generator["selected_questions"]:
-                    st.session_state.bulk_generator["selected_questions"].remove(i)
+    _render_question_details(generated_questions)
     
     # Save selected questions button
     if st.button("Save Selected Questions to Database"):
         save_questions_to_database(generated_questions, st.session_state.bulk_generator["selected_questions"], chapter_id)
 
+@st.fragment
+def _render_question_details(generated_questions):
+    """Render the full details of one generated question; switching questions reruns only this fragment."""
+    i = st.selectbox(
+        "Show details for",
+        options=range(len(generated_questions)),
+        format_func=lambda i: f"Question {i+1}: {generated_questions[i]['question_content'][:100]}...",
+        key="bulk_detail_question"
+    )
+    question = generated_questions[i]
+    
+    with st.container(border=True):
+        st.markdown(f"**Question Content:** {question['question_content']}")
+        st.markdown(f"**Question Type:** {question['question_type']}")
+        st.markdown(f"**Difficulty:** {question['difficulty']}/5.0")
+        st.markdown(f"**Estimated Time:** {question.get('estimated_time', 5)} minutes")
+        st.markdown(f"**Student Level:** {question.get('student_level', 'Intermediate')}")
+        
+        if "tags" in question and question["tags"]:
+            st.markdown(f"**Tags:** {question['tags']}")
+            
+        st.markdown(f"**Correct Answer:** {question['correct_answer']}")
+        st.markdown(f"**Explanation:** {question['explanation']}")
+        
+        if question['question_type'] == "Multiple Choice" and "options" in question:
+            st.markdown("**Options:**")
+            for option in question["options"]:
+                st.markdown(f"- {option}")
+
 def save_questions_to_database(generated_questions, selected_indices, chapter_id):
     """Save the selected generated questions to the database."""
     if not selected_indices:
         show_error("Please select at least one question to save.")
         return
     
-    try:
-        db = next(get_db())
-        saved_count = 0
+    rows = []
+    # Save in the order the questions were generated
+    for idx in sorted(selected_indices):
+        q = generated_questions[idx]
         
-        for idx in selected_indices:
-            q = generated_questions[idx]
-            
-            # Format correct answer for multiple choice questions
-            final_correct_answer = q["correct_answer"]
-            if q["question_type"] == "Multiple Choice" and "options" in q:
-                # Store options in the correct_answer field with format: correct_answer|option1|option2|option3|option4
-                options_str = "|".join(q["options"])
-                final_correct_answer = f"{q['correct_answer']}|{options_str}"
-            
-            # Create new question
-            new_question = Question(
-                chapter_id=chapter_id,
-                content=q["question_content"],
-                question_type=q["question_type"],
-                correct_answer=final_correct_answer,
-                explanation=q["explanation"],
-                difficulty=float(q["difficulty"]),
-                estimated_time=int(q.get("estimated_time", 5)),
-                student_level=q.get("student_level", "Intermediate"),
-                tags=q.get("tags", ""),
-                created_at=datetime.utcnow(),
-                updated_at=datetime.utcnow()
-            )
-            
-            db.add(new_question)
-            saved_count += 1
+        # Format correct answer for multiple choice questions
+        final_correct_answer = q["correct_answer"]
+        if q["question_type"] == "Multiple Choice" and "options" in q:
+            # Store options in the correct_answer field with format: correct_answer|option1|option2|option3|option4
+            options_str = "|".join(q["options"])
+            final_correct_answer = f"{q['correct_answer']}|{options_str}"
         
-        db.commit()
+        rows.append({
+            "chapter_id": chapter_id,
+            "content": q["question_content"],
+            "question_type": q["question_type"],
+            "correct_answer": final_correct_answer,
+            "explanation": q["explanation"],
+            "difficulty": float(q["difficulty"]),
+            "estimated_time": int(q.get("estimated_time", 5)),
+            "student_level": q.get("student_level", "Intermediate"),
+            "tags": q.get("tags", ""),
+        })
+    
+    try:
+        # One executemany INSERT; add_questions_bulk fills in the difficulty labels
+        # and refreshes the caches that list questions
+        saved_count = add_questions_bulk(rows)
         
         # Show success message
         show_success(f"Successfully saved {saved_count} questions to the database!")
@@ -268,12 +313,10 @@ def save_questions_to_database(generated_questions, selected_indices, chapter_id
         st.session_state.bulk_generator = {
             "generated_questions": [],
             "form_submitted": True,
-            "selected_questions": [],
+            "selected_questions": set(),
             "generation_complete": False
         }
         
     except Exception as e:
         logger.error(f"Error saving questions to database: {str(e)}")
-        show_error(f"Error: {str(e)}")
-        if 'db' in locals():
-            db.rollback()
\ No newline at end of file
+        show_error(f"Error: {str(e)}")
\ No newline at end of file
@@ -1,7 +1,7 @@
 import streamlit as st
 from database import get_db
 from models import Course, Chapter, Question
-from utils import show_success, show_error, format_ilos
+from utils import show_success, show_error, format_ilos, difficulty_label, clear_course_caches, clear_question_caches
 from datetime import datetime
 
 st.title("Edit Item")
@@ -44,6 +44,7 @@ if item_type == "Course":
                 course.description = description
                 course.updated_at = datetime.utcnow()
                 db.commit()
+                clear_course_caches()
                 show_success("Course updated successfully!")
                 
                 # Clear the editing state
@@ -90,6 +91,7 @@ elif item_type == "Chapter":
                 chapter.ilos = ilos
                 chapter.updated_at = datetime.utcnow()
                 db.commit()
+                clear_course_caches()
                 show_success("Chapter updated successfully!")
                 
                 # Clear the editing state
@@ -147,6 +149,7 @@ elif item_type == "Question":
                 question.chapter_id = chapter_choice[0]
                 question.content = content
                 question.difficulty = difficulty
+                question.difficulty_label = difficulty_label(difficulty)
                 question.estimated_time = estimated_time
                 question.student_level = student_level
                 question.question_type = question_type
@@ -155,6 +158,7 @@ elif item_type == "Question":
                 question.explanation = explanation
                 question.updated_at = datetime.utcnow()
                 db.commit()
+                clear_question_caches()
                 show_success("Question updated successfully!")
                 
                 # Clear the editing state
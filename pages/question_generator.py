@@ -1,11 +1,10 @@
 import streamlit as st
 import pandas as pd
-from database import get_db
-from models import Course, Chapter, Question
-from datetime import datetime
+from database import get_session_factory
+from models import Question
 import logging
-from utils import show_success, show_error, rerun
-from llm_utils import analyze_question
+from utils import show_success, show_error, rerun, load_course_catalog, difficulty_label, clear_question_caches
+from llm_utils import analyze_question, parse_analysis_text
 import json
 import re
 
@@ -13,6 +12,10 @@ import re
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Fallback patterns for analysis texts that parse_analysis_text can't read
+_TIME_RE = re.compile(r'\*\*Estimated Time:\*\* (\d+) minutes')
+_LEVEL_RE = re.compile(r'\*\*Appropriate Student Level:\*\* (\w+)')
+
 def show_question_generator():
     """Display the question generator page."""
     st.markdown("## AI Question Generator")
@@ -33,13 +36,12 @@ def show_question_generator():
     if st.session_state.analysis_results:
         display_analysis_dashboard(st.session_state.analysis_results)
     
+    db = get_session_factory()()
     try:
-        db = next(get_db())
-        
         # Get all courses and chapters
-        courses = db.query(Course).all()
+        catalog = load_course_catalog()
         
-        if not courses:
+        if not catalog:
             st.info("No courses available yet. You can add courses from the 'Add' tab.")
             # Display a placeholder instead of returning
             st.markdown("### Please add courses to use the AI Question Generator")
@@ -48,13 +50,14 @@ def show_question_generator():
         # Course selection
         selected_course_id = st.selectbox(
             "Select Course",
-            options=[(c.id, c.title) for c in courses],
+            options=[(course_id, course["title"]) for course_id, course in catalog.items()],
             format_func=lambda x: x[1],
             key="question_course"
         )
+        selected_course = catalog[selected_course_id[0]]
         
         # Get chapters for the selected course
-        chapters = db.query(Chapter).filter_by(course_id=selected_course_id[0]).all()
+        chapters = selected_course["chapters"]
         
         if not chapters:
             st.warning(f"No chapters available for the selected course. Please add a chapter first.")
@@ -63,94 +66,97 @@ def show_question_generator():
         # Chapter selection
         selected_chapter_id = st.selectbox(
             "Select Chapter",
-            options=[(c.id, c.title) for c in chapters],
+            options=[(chapter_id, chapter["title"]) for chapter_id, chapter in chapters.items()],
             format_func=lambda x: x[1],
             key="question_chapter"
         )
         
-        # Get the selected chapter and course
-        selected_chapter = db.query(Chapter).get(selected_chapter_id[0])
-        selected_course = db.query(Course).get(selected_course_id[0])
+        # Get the selected chapter
+        selected_chapter = chapters.get(selected_chapter_id[0])
         
         if not selected_chapter:
             st.warning("Selected chapter not found.")
             return
         
-        # Question content
-        question_content = st.text_area(
-            "Question Content", 
-            height=150,
-            help="Enter the complete question text here.",
-            key="question_content"
-        )
-        
-        # Question type selection
+        # Question type stays outside the form so the answer options update when it changes
         question_type = st.selectbox(
             "Question Type",
             options=["Multiple Choice", "True/False", "Short Answer"],
             help="Select the type of question"
         )
         
-        # Correct answer
-        correct_answer = st.text_area(
-            "Correct Answer", 
-            height=100,
-            help="Enter the correct answer for this question",
-            key="correct_answer"
-        )
-        
-        # Explanation
-        explanation = st.text_area(
-            "Explanation",
-            height=100,
-            help="Provide an explanation for why this is the correct answer",
-            key="explanation"
-        )
-        
-        # Add new fields for difficulty, student level, and estimated time
-        st.markdown("### Additional Settings")
-        st.info("You can manually set these values or let the AI determine them automatically.")
-        
-        # Difficulty level slider from 1 to 5
-        difficulty_level = st.slider(
-            "Difficulty Level",
-            min_value=1,
-            max_value=5,
-            value=3,
-            step=1,
-            help="Set the difficulty level of the question from 1 (easiest) to 5 (hardest)"
-        )
-        
-        # Student level selection
-        student_level = st.selectbox(
-            "Student Level",
-            options=["Beginner", "Intermediate", "Advanced"],
-            index=1,  # Default to Intermediate
-            help="Select the appropriate student level for this question"
-        )
-        
-        # Estimated time in minutes
-        estimated_time = st.number_input(
-            "Estimated Time (minutes)",
-            min_value=1,
-            max_value=60,
-            value=5,
-            step=1,
-            help="Estimate how many minutes it would take to answer this question"
-        )
-        
-        # For multiple choice, add options
-        options = []
-        if question_type == "Multiple Choice":
-            st.markdown("### Answer Options")
-            st.info("Enter 4 options. Make sure one matches the correct answer exactly.")
-            for i in range(4):
-                option = st.text_input(f"Option {chr(65+i)}", key=f"option_{i}")
-                if option:
-                    options.append(f"{chr(65+i)}. {option}")
+        # Collect the remaining inputs in a form so editing them doesn't rerun the page
+        with st.form("qgen_form"):
+            # Question content
+            question_content = st.text_area(
+                "Question Content", 
+                height=150,
+                help="Enter the complete question text here.",
+                key="question_content"
+            )
+            
+            # Correct answer
+            correct_answer = st.text_area(
+                "Correct Answer", 
+                height=100,
+                help="Enter the correct answer for this question",
+                key="correct_answer"
+            )
+            
+            # Explanation
+            explanation = st.text_area(
+                "Explanation",
+                height=100,
+                help="Provide an explanation for why this is the correct answer",
+                key="explanation"
+            )
+            
+            # Add new fields for difficulty, student level, and estimated time
+            st.markdown("### Additional Settings")
+            st.info("You can manually set these values or let the AI determine them automatically.")
+            
+            # Difficulty level slider from 1 to 5
+            difficulty_level = st.slider(
+                "Difficulty Level",
+                min_value=1,
+                max_value=5,
+                value=3,
+                step=1,
+                help="Set the difficulty level of the question from 1 (easiest) to 5 (hardest)"
+            )
+            
+            # Student level selection
+            student_level = st.selectbox(
+                "Student Level",
+                options=["Beginner", "Intermediate", "Advanced"],
+                index=1,  # Default to Intermediate
+                help="Select the appropriate student level for this question"
+            )
+            
+            # Estimated time in minutes
+            estimated_time = st.number_input(
+                "Estimated Time (minutes)",
+                min_value=1,
+                max_value=60,
+                value=5,
+                step=1,
+                help="Estimate how many minutes it would take to answer this question"
+            )
+            
+            # For multiple choice, add options
+            options = []
+            if question_type == "Multiple Choice":
+                st.markdown("### Answer Options")
+                st.info("Enter 4 options. Make sure one matches the correct answer exactly.")
+                for i in range(4):
+                    option = st.text_input(f"Option {chr(65+i)}", key=f"option_{i}")
+                    if option:
+                        options.append(f"{chr(65+i)}. {option}")
+            
+            submit = st.form_submit_button("Generate Question Analysis")
         
         # Add question button
-        if st.button("Generate Question Analysis"):
+        if submit:
             if not question_content or not correct_answer or not explanation:
                 show_error("Please fill in all required fields: question content, correct answer, and explanation.")
                 return
@@ -162,30 +168,36 @@ def show_question_generator():
             try:
                 # First analyze the question with AI
                 with st.spinner("AI is analyzing the question..."):
+                    # Stream the raw model output into a placeholder while it is generated
+                    stream_placeholder = st.empty()
+                    
                     # Call analyze_question function to get difficulty and other metrics
                     difficulty_rating, analysis_text = analyze_question(
                         question_content=question_content,
                         question_type=question_type,
-                        course_title=selected_course.title,
-                        chapter_title=selected_chapter.title,
-                        ilos=selected_chapter.ilos
+                        course_title=selected_course["title"],
+                        chapter_title=selected_chapter["title"],
+                        ilos=selected_chapter["ilos"],
+                        placeholder=stream_placeholder
                     )
+                    stream_placeholder.empty()
                     
                     if difficulty_rating is None:
                         show_error("Failed to analyze question. Please try again.")
                         return
                     
                     try:
-                        # The estimated_time and student_level are now directly included in the analysis_text
-                        # in a structured format, so we don't need to use regex to extract them
-                        
-                        # Extract time directly from the analysis text
-                        time_match = re.search(r'\*\*Estimated Time:\*\* (\d+) minutes', analysis_text)
-                        estimated_time_ai = int(time_match.group(1)) if time_match else 5  # default to 5 minutes
-                        
-                        # Extract student level directly from the analysis text
-                        level_match = re.search(r'\*\*Appropriate Student Level:\*\* (\w+)', analysis_text)
-                        student_level_ai = level_match.group(1) if level_match else "Intermediate"
+                        # Read time and student level back from the formatted analysis in one pass
+                        parsed = parse_analysis_text(analysis_text)
+                        if parsed is not None:
+                            estimated_time_ai = parsed.estimated_time
+                            student_level_ai = parsed.student_level
+                        else:
+                            # Fall back to the field patterns for unformatted (raw) analyses
+                            time_match = _TIME_RE.search(analysis_text)
+                            estimated_time_ai = int(time_match.group(1)) if time_match else 5  # default to 5 minutes
+                            level_match = _LEVEL_RE.search(analysis_text)
+                            student_level_ai = level_match.group(1) if level_match else "Intermediate"
                         
                         # Use manually set values if they differ from defaults, otherwise use AI values
                         final_difficulty = difficulty_level if difficulty_level != 3 else float(difficulty_rating)
@@ -206,27 +218,30 @@ def show_question_generator():
                             correct_answer=final_correct_answer,
                             explanation=explanation,
                             difficulty=final_difficulty,
+                            difficulty_label=difficulty_label(final_difficulty),
                             estimated_time=final_estimated_time,
                             student_level=final_student_level,
-                            created_at=datetime.utcnow(),
-                            updated_at=datetime.utcnow(),
                             created_by=st.session_state.user["id"]  # Track who created the question
                         )
                         
                         db.add(new_question)
+                        # Flush to get the new id from the INSERT, then commit without expiring it
+                        db.flush()
+                        question_id = new_question.id
                         db.commit()
+                        clear_question_caches()
                         
                         # Store analysis results in session state
                         st.session_state.analysis_results = {
-                            "question_id": new_question.id,
+                            "question_id": question_id,
                             "question_content": question_content,
                             "question_type": question_type,
                             "difficulty_rating": difficulty_rating,
                             "estimated_time": estimated_time,
                             "student_level": student_level,
                             "analysis_text": analysis_text,
-                            "course": selected_course.title,
-                            "chapter": selected_chapter.title,
+                            "course": selected_course["title"],
+                            "chapter": selected_chapter["title"],
                             "options": options if question_type == "Multiple Choice" else None,
                             "correct_answer": correct_answer,
                             "explanation": explanation
@@ -246,12 +261,13 @@ def show_question_generator():
             except Exception as e:
                 logger.error(f"Error adding question: {str(e)}")
                 show_error(f"Error: {str(e)}")
-                if 'db' in locals():
-                    db.rollback()
+                db.rollback()
     
     except Exception as e:
         logger.error(f"Error in question generator: {str(e)}")
         show_error(f"Error: {str(e)}")
+    finally:
+        db.close()
 
 def display_analysis_dashboard(results):
     """Display a dashboard with the AI analysis results."""
@@ -2,193 +2,372 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-from database import get_db
-from models import Question, Chapter, Course
 import logging
+from concurrent.futures import ThreadPoolExecutor
+import time
 from analysis_display import display_analysis_results
-from llm_utils import analyze_question
+from llm_utils import analyze_question, analyze_questions_batch, parse_analysis_text, is_raw_analysis
+from utils import difficulty_band, load_course_options, course_options_version, load_question_previews, load_question_details, load_question_details_many
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def show_response_comparison():
-    """Display a dashboard comparing professor evaluations with model responses."""
-    st.markdown("### Professor vs AI Model Response Comparison")
+# Styles for the dashboard cards and headers
+RESPONSE_COMPARISON_CSS = """
+<style>
+.dashboard-container {
+    background-color: #f8f9fa;
+    border-radius: 10px;
+    padding: 20px;
+    margin-bottom: 20px;
+}
+.metric-card {
+    background-color: white;
+    border-radius: 10px;
+    padding: 15px;
+    box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1);
+    text-align: center;
+    height: 100%;
+}
+.metric-card.easy {
+    border-left: 5px solid #28a745;
+}
+.metric-card.medium {
+    border-left: 5px solid #ffc107;
+}
+.metric-card.hard {
+    border-left: 5px solid #dc3545;
+}
+.metric-value {
+    font-size: 24px;
+    font-weight: bold;
+    margin: 10px 0;
+}
+.metric-label {
+    font-size: 14px;
+    color: #6c757d;
+}
+.comparison-header {
+    background-color: #e9ecef;
+    padding: 10px;
+    border-radius: 5px;
+    margin-bottom: 15px;
+    font-weight: bold;
+}
+</style>
+"""
+
+# The comparison bars are static, so skip Plotly's hover/zoom handlers and mode bar
+STATIC_CHART_CONFIG = {"staticPlot": True, "displayModeBar": False}
+
+# Metric card classes for the utils.difficulty_band bands
+_DIFFICULTY_CLASSES = ("easy", "medium", "hard")
+
+# Worker threads for running the AI analysis alongside page rendering
+_ANALYSIS_EXECUTOR = ThreadPoolExecutor(max_workers=4)
+
+# Questions analyzed per batch in the all-questions comparison
+_AGGREGATE_BATCH_SIZE = 25
+
+# Lifetime of each session's copy of the course list
+_COURSE_OPTIONS_TTL = 300
+
+def get_course_options() -> list:
+    """Return the course filter options, kept in session state so interaction reruns reuse the same list."""
+    loaded_at = st.session_state.get("comparison_course_options_loaded_at", 0.0)
+    if (
+        "comparison_course_options" not in st.session_state
+        or st.session_state.get("comparison_course_options_version") != course_options_version()
+        or time.monotonic() - loaded_at > _COURSE_OPTIONS_TTL
+    ):
+        st.session_state.comparison_course_options = [(0, "All Courses")] + load_course_options()
+        st.session_state.comparison_course_options_loaded_at = time.monotonic()
+        st.session_state.comparison_course_options_version = course_options_version()
+    return st.session_state.comparison_course_options
+
+@st.cache_data(ttl=3600, max_entries=16, show_spinner="Analyzing all questions with AI model...")
+def analyze_all_questions(items: tuple) -> list:
+    """
+    Analyze many questions in one concurrent batch.
+    
+    items holds (content, question_type, course_title, chapter_title, ilos) tuples, so
+    the cache is keyed on the analyzed inputs and an edited question is analyzed again.
+    Returns one dict per item with the AI difficulty, time and level (None where the
+    analysis failed or could not be parsed).
+    """
+    results = analyze_questions_batch([
+        {
+            "question_content": content,
+            "question_type": question_type,
+            "course_title": course_title,
+            "chapter_title": chapter_title,
+            "ilos": ilos
+        }
+        for content, question_type, course_title, chapter_title, ilos in items
+    ])
+    # Unparsed fallbacks carry a placeholder difficulty, so only parsed analyses count
+    analyses = [
+        parse_analysis_text(analysis_text) if difficulty_rating is not None else None
+        for difficulty_rating, analysis_text in results
+    ]
+    if items and all(analysis is None for analysis in analyses):
+        # Raising keeps a completely failed batch out of the cache
+        errors = [analysis_text for difficulty_rating, analysis_text in results if difficulty_rating is None]
+        raise RuntimeError(errors[0] if errors else "The AI model's responses could not be parsed")
+    
+    return [
+        {
+            "ai_difficulty": analysis.difficulty_rating if analysis else None,
+            "ai_time": analysis.estimated_time if analysis else None,
+            "ai_level": analysis.student_level if analysis else None
+        }
+        for analysis in analyses
+    ]
+
+# The spinner is shown by the caller; this runs on a worker thread
+@st.cache_data(ttl=3600, max_entries=500, show_spinner=False)
+def cached_analyze_question(
+    question_id: int,
+    question_content: str,
+    question_type: str,
+    course_title: str,
+    chapter_title: str,
+    ilos: str
+) -> tuple:
+    """Run analyze_question once per question and inputs; failed analyses raise so they aren't cached."""
+    difficulty_rating, analysis_text = analyze_question(
+        question_content=question_content,
+        question_type=question_type,
+        course_title=course_title,
+        chapter_title=chapter_title,
+        ilos=ilos
+    )
+    if difficulty_rating is None:
+        raise RuntimeError(analysis_text)
+    if is_raw_analysis(analysis_text):
+        logger.error(f"Unparseable analysis for question {question_id}: {analysis_text}")
+        raise RuntimeError("The AI model's response could not be parsed")
+    return difficulty_rating, analysis_text
+
+@st.cache_data(max_entries=256)
+def build_comparison_bar(values: tuple, texts: tuple, title: str, yaxis_title: str, yrange=None) -> dict:
+    """Build a Professor vs AI Model bar chart as a Plotly figure dict, cached on its inputs."""
+    fig = go.Figure()
     
-    # Create a container with custom styling for the dashboard
-    st.markdown("""
-    <style>
-    .dashboard-container {
-        background-color: #f8f9fa;
-        border-radius: 10px;
-        padding: 20px;
-        margin-bottom: 20px;
-    }
-    .metric-card {
-        background-color: white;
-        border-radius: 10px;
-        padding: 15px;
-        box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1);
-        text-align: center;
-        height: 100%;
-    }
-    .metric-card.easy {
-        border-left: 5px solid #28a745;
-    }
-    .metric-card.medium {
-        border-left: 5px solid #ffc107;
-    }
-    .metric-card.hard {
-        border-left: 5px solid #dc3545;
-    }
-    .metric-value {
-        font-size: 24px;
-        font-weight: bold;
-        margin: 10px 0;
-    }
-    .metric-label {
-        font-size: 14px;
-        color: #6c757d;
-    }
-    .comparison-header {
-        background-color: #e9ecef;
-        padding: 10px;
-        border-radius: 5px;
-        margin-bottom: 15px;
-        font-weight: bold;
-    }
-    </style>
-    """, unsafe_allow_html=True)
+    fig.add_trace(go.Bar(
+        x=['Professor', 'AI Model'],
+        y=list(values),
+        marker_color=['#4e73df', '#36b9cc'],
+        text=list(texts),
+        textposition='auto'
+    ))
     
-    # Get database connection
-    db = next(get_db())
+    yaxis = dict(title=yaxis_title)
+    if yrange is not None:
+        yaxis["range"] = list(yrange)
     
-    # Get all courses for filtering
-    courses = db.query(Course).all()
-    course_options = [(c.id, c.title) for c in courses]
+    fig.update_layout(
+        title=title,
+        yaxis=yaxis,
+        height=300,
+        margin=dict(l=20, r=20, t=40, b=20),
+        plot_bgcolor='rgba(0,0,0,0)'
+    )
     
-    # Add an "All Courses" option
-    course_options.insert(0, (0, "All Courses"))
+    return fig.to_plotly_json()
+
+def difficulty_class(difficulty: float) -> str:
+    """Map a 1-5 difficulty to its metric card class."""
+    return _DIFFICULTY_CLASSES[difficulty_band(difficulty)]
+
+def render_metric_card(label: str, value, cls: str = "", color: str = ""):
+    """Render one metric card with a single st.markdown call."""
+    value_style = f" style='color: {color};'" if color else ""
+    st.markdown(
+        f"<div class='metric-card {cls}'>"
+        f"<div class='metric-label'>{label}</div>"
+        f"<div class='metric-value'{value_style}>{value}</div>"
+        "</div>",
+        unsafe_allow_html=True
+    )
+
+def show_response_comparison():
+    """Display a dashboard comparing professor evaluations with model responses."""
+    st.markdown("### Professor vs AI Model Response Comparison")
     
-    # Course filter
+    # Custom styling for the dashboard; Streamlit drops elements that a rerun doesn't
+    # emit, so the style block is sent on every run rather than once per session
+    st.markdown(RESPONSE_COMPARISON_CSS, unsafe_allow_html=True)
+    
+    # Course filter, with an "All Courses" option first
     selected_course = st.selectbox(
         "Select Course",
-        options=course_options,
+        options=get_course_options(),
         format_func=lambda x: x[1]
     )
     
-    # Get questions based on course filter
-    if selected_course[0] == 0:  # All Courses
-        questions = db.query(Question).join(Chapter).join(Course).all()
-    else:
-        questions = db.query(Question).join(Chapter).join(Course).filter(Course.id == selected_course[0]).all()
+    # Get questions based on course filter (0 is "All Courses")
+    question_map = load_question_previews(selected_course[0])
     
-    if not questions:
+    if not question_map:
         st.info("No questions available for analysis. Please add questions first.")
         return
     
-    # Select a question for detailed comparison
-    question_options = [(q.id, f"{q.content[:50]}...") for q in questions]
+    # Select a question for detailed comparison; labels are looked up by id
     selected_question_id = st.selectbox(
         "Select a question for detailed comparison",
-        options=question_options,
-        format_func=lambda x: x[1]
-    )[0]
+        options=list(question_map),
+        format_func=question_map.get
+    )
+    
+    # Optional course-wide comparison, analyzed in one batch instead of per question
+    if selected_course[0] == 0 and st.checkbox("Compare all questions with the AI model"):
+        show_aggregate_comparison(tuple(question_map))
     
-    # Get the selected question
-    selected_question = db.query(Question).filter(Question.id == selected_question_id).first()
+    # Only the evaluation panel reruns when widgets inside it change
+    _ai_panel(selected_question_id)
+
+def show_aggregate_comparison(question_ids: tuple):
+    """Display professor vs AI agreement across many questions, one capped batch at a time."""
+    st.markdown("<div class='comparison-header'>All Questions Comparison</div>", unsafe_allow_html=True)
+    
+    # Every question in a batch is one LLM request, so batches are capped and paged through
+    batch_count = -(-len(question_ids) // _AGGREGATE_BATCH_SIZE)
+    batch_number = st.number_input("Question batch", min_value=1, max_value=batch_count, value=1, step=1) if batch_count > 1 else 1
+    start = (batch_number - 1) * _AGGREGATE_BATCH_SIZE
+    batch_ids = question_ids[start:start + _AGGREGATE_BATCH_SIZE]
+    st.caption(
+        f"Questions {start + 1}-{start + len(batch_ids)} of {len(question_ids)}; "
+        "each question in the batch is a separate AI model request."
+    )
+    
+    # Only analyze on an explicit click; the analyzed batch is remembered across reruns
+    if st.button("Analyze this batch"):
+        st.session_state.comparison_analyzed_batch = batch_ids
+    if st.session_state.get("comparison_analyzed_batch") != batch_ids:
+        return
+    
+    try:
+        details = load_question_details_many(batch_ids)
+        ai_results = analyze_all_questions(tuple(
+            (d["content"], d["question_type"], d["course_title"], d["chapter_title"], d["ilos"] or "Not specified")
+            for d in details
+        ))
+    except Exception as e:
+        st.error(f"Error analyzing questions: {str(e)}")
+        logger.error(f"Error analyzing questions: {str(e)}")
+        return
+    
+    df = pd.DataFrame([
+        {
+            "id": d["id"],
+            "question": f"{d['content'][:50]}...",
+            "professor_difficulty": d["difficulty"],
+            "ai_difficulty": ai["ai_difficulty"],
+            "professor_time": d["estimated_time"],
+            "ai_time": ai["ai_time"],
+            "professor_level": d["student_level"],
+            "ai_level": ai["ai_level"]
+        }
+        for d, ai in zip(details, ai_results)
+    ])
+    analyzed = df.dropna(subset=["ai_difficulty", "ai_time", "ai_level"])
+    
+    metrics_col1, metrics_col2, metrics_col3 = st.columns(3)
+    
+    with metrics_col1:
+        difficulty_gap = (analyzed["ai_difficulty"] - analyzed["professor_difficulty"]).abs().mean()
+        render_metric_card("Avg. Difficulty Difference", f"{difficulty_gap:.2f}" if pd.notna(difficulty_gap) else "N/A")
+    
+    with metrics_col2:
+        time_gap = (analyzed["ai_time"] - analyzed["professor_time"]).abs().mean()
+        render_metric_card("Avg. Time Difference", f"{time_gap:.1f} min" if pd.notna(time_gap) else "N/A")
+    
+    with metrics_col3:
+        level_agreement = (analyzed["ai_level"].str.lower() == analyzed["professor_level"].str.lower()).mean()
+        render_metric_card("Student Level Agreement", f"{level_agreement:.0%}" if pd.notna(level_agreement) else "N/A")
+    
+    st.caption(f"{len(analyzed)} of {len(df)} questions analyzed")
+    st.dataframe(
+        df.drop(columns=["id"]).rename(columns={
+            "question": "Question",
+            "professor_difficulty": "Professor Difficulty",
+            "ai_difficulty": "AI Difficulty",
+            "professor_time": "Professor Time (min)",
+            "ai_time": "AI Time (min)",
+            "professor_level": "Professor Level",
+            "ai_level": "AI Level"
+        }),
+        use_container_width=True,
+        hide_index=True
+    )
+
+@st.fragment
+def _ai_panel(question_id: int):
+    """Render the professor vs AI evaluation, comparison metrics and charts for one question."""
+    # Get the selected question with its chapter and course details
+    selected_question = load_question_details(question_id)
     
     if selected_question:
-        # Get chapter and course information
-        chapter = db.query(Chapter).filter(Chapter.id == selected_question.chapter_id).first()
-        course = db.query(Course).filter(Course.id == chapter.course_id).first()
         
         # Display the question content
         st.markdown("<div class='comparison-header'>Question Content</div>", unsafe_allow_html=True)
-        st.markdown(f"**{selected_question.content}**")
+        st.markdown(f"**{selected_question['content']}**")
         
         # Create two columns for professor vs AI comparison
+        # Start the AI analysis in the background so the LLM round trip overlaps
+        # with rendering the professor side
+        ilos = selected_question['ilos'] if selected_question['ilos'] else "Not specified"
+        analysis_future = _ANALYSIS_EXECUTOR.submit(
+            cached_analyze_question,
+            question_id=selected_question['id'],
+            question_content=selected_question['content'],
+            question_type=selected_question['question_type'],
+            course_title=selected_question['course_title'],
+            chapter_title=selected_question['chapter_title'],
+            ilos=ilos
+        )
+        
         col1, col2 = st.columns(2)
         
         with col1:
             st.markdown("<div class='comparison-header'>Professor Evaluation</div>", unsafe_allow_html=True)
             
-            # Determine difficulty category for styling
-            difficulty_class = "easy"
-            if selected_question.difficulty > 2.5 and selected_question.difficulty <= 3.5:
-                difficulty_class = "medium"
-            elif selected_question.difficulty > 3.5:
-                difficulty_class = "hard"
-            
             # Display professor metrics in cards
-            st.markdown(f"<div class='metric-card {difficulty_class}'>", unsafe_allow_html=True)
-            st.markdown(f"<div class='metric-label'>Difficulty Rating</div>", unsafe_allow_html=True)
-            st.markdown(f"<div class='metric-value'>{selected_question.difficulty}/5.0</div>", unsafe_allow_html=True)
-            st.markdown("</div>", unsafe_allow_html=True)
+            render_metric_card("Difficulty Rating", f"{selected_question['difficulty']}/5.0", cls=difficulty_class(selected_question['difficulty']))
             
-            st.markdown("<div class='metric-card'>", unsafe_allow_html=True)
-            st.markdown(f"<div class='metric-label'>Estimated Time</div>", unsafe_allow_html=True)
-            st.markdown(f"<div class='metric-value'>{selected_question.estimated_time} minutes</div>", unsafe_allow_html=True)
-            st.markdown("</div>", unsafe_allow_html=True)
+            render_metric_card("Estimated Time", f"{selected_question['estimated_time']} minutes")
             
-            st.markdown("<div class='metric-card'>", unsafe_allow_html=True)
-            st.markdown(f"<div class='metric-label'>Student Level</div>", unsafe_allow_html=True)
-            st.markdown(f"<div class='metric-value'>{selected_question.student_level}</div>", unsafe_allow_html=True)
-            st.markdown("</div>", unsafe_allow_html=True)
+            render_metric_card("Student Level", selected_question['student_level'])
         
         with col2:
             st.markdown("<div class='comparison-header'>AI Model Evaluation</div>", unsafe_allow_html=True)
             
-            # Get AI analysis for the question
-            with st.spinner("Analyzing question with AI model..."):
-                try:
-                    # Get chapter ILOs
-                    ilos = chapter.ilos if chapter.ilos else "Not specified"
-                    
-                    # Call the analyze_question function
-                    difficulty_rating, analysis_text = analyze_question(
-                        question_content=selected_question.content,
-                        question_type=selected_question.question_type,
-                        course_title=course.title,
-                        chapter_title=chapter.title,
-                        ilos=ilos
-                    )
-                    
-                    # Extract estimated time and student level from analysis text
-                    import re
-                    estimated_time_match = re.search(r'Estimated Time:\*\* (\d+)', analysis_text)
-                    student_level_match = re.search(r'Student Level:\*\* (\w+)', analysis_text)
-                    
-                    ai_estimated_time = int(estimated_time_match.group(1)) if estimated_time_match else 5
-                    ai_student_level = student_level_match.group(1) if student_level_match else "Intermediate"
-                    
-                    # Determine AI difficulty category for styling
-                    ai_difficulty_class = "easy"
-                    if difficulty_rating > 2.5 and difficulty_rating <= 3.5:
-                        ai_difficulty_class = "medium"
-                    elif difficulty_rating > 3.5:
-                        ai_difficulty_class = "hard"
-                    
-                    # Display AI metrics in cards
-                    st.markdown(f"<div class='metric-card {ai_difficulty_class}'>", unsafe_allow_html=True)
-                    st.markdown(f"<div class='metric-label'>Difficulty Rating</div>", unsafe_allow_html=True)
-                    st.markdown(f"<div class='metric-value'>{difficulty_rating}/5.0</div>", unsafe_allow_html=True)
-                    st.markdown("</div>", unsafe_allow_html=True)
-                    
-                    st.markdown("<div class='metric-card'>", unsafe_allow_html=True)
-                    st.markdown(f"<div class='metric-label'>Estimated Time</div>", unsafe_allow_html=True)
-                    st.markdown(f"<div class='metric-value'>{ai_estimated_time} minutes</div>", unsafe_allow_html=True)
-                    st.markdown("</div>", unsafe_allow_html=True)
-                    
-                    st.markdown("<div class='metric-card'>", unsafe_allow_html=True)
-                    st.markdown(f"<div class='metric-label'>Student Level</div>", unsafe_allow_html=True)
-                    st.markdown(f"<div class='metric-value'>{ai_student_level}</div>", unsafe_allow_html=True)
-                    st.markdown("</div>", unsafe_allow_html=True)
-                    
-                except Exception as e:
-                    st.error(f"Error analyzing question: {str(e)}")
-                    logger.error(f"Error analyzing question: {str(e)}")
+            # Get AI analysis for the question (cached, so reruns skip the LLM call)
+            difficulty_rating, analysis_text = None, "AI analysis is not available for this question."
+            ai_estimated_time = ai_student_level = None
+            try:
+                # Wait for the background analysis
+                with st.spinner("Analyzing question with AI model..."):
+                    difficulty_rating, analysis_text = analysis_future.result()
+                
+                # Recover estimated time and student level the same way as the batch comparison
+                analysis = parse_analysis_text(analysis_text)
+                if analysis:
+                    ai_estimated_time = analysis.estimated_time
+                    ai_student_level = analysis.student_level
+                
+                # Display AI metrics in cards
+                render_metric_card("Difficulty Rating", f"{difficulty_rating}/5.0", cls=difficulty_class(difficulty_rating))
+                
+                render_metric_card("Estimated Time", f"{ai_estimated_time} minutes" if ai_estimated_time is not None else "N/A")
+                
+                render_metric_card("Student Level", ai_student_level or "N/A")
+                
+            except Exception as e:
+                st.error(f"Error analyzing question: {str(e)}")
+                logger.error(f"Error analyzing question: {str(e)}")
         
         # Comparison charts section
         st.markdown("<div class='comparison-header'>Comparison Analysis</div>", unsafe_allow_html=True)
@@ -197,105 +376,66 @@ def show_response_comparison():
         metrics_col1, metrics_col2, metrics_col3 = st.columns(3)
         
         with metrics_col1:
-            try:
+            if difficulty_rating is not None and selected_question['difficulty']:
                 # Calculate difficulty difference
-                diff_percentage = ((difficulty_rating - selected_question.difficulty) / selected_question.difficulty) * 100
+                diff_percentage = ((difficulty_rating - selected_question['difficulty']) / selected_question['difficulty']) * 100
                 diff_text = "higher" if diff_percentage > 0 else "lower"
                 
-                st.markdown("<div class='metric-card'>", unsafe_allow_html=True)
-                st.markdown(f"<div class='metric-label'>Difficulty Difference</div>", unsafe_allow_html=True)
-                st.markdown(f"<div class='metric-value'>{abs(diff_percentage):.1f}% {diff_text}</div>", unsafe_allow_html=True)
-                st.markdown("</div>", unsafe_allow_html=True)
-            except:
-                st.markdown("<div class='metric-card'>", unsafe_allow_html=True)
-                st.markdown(f"<div class='metric-label'>Difficulty Difference</div>", unsafe_allow_html=True)
-                st.markdown(f"<div class='metric-value'>N/A</div>", unsafe_allow_html=True)
-                st.markdown("</div>", unsafe_allow_html=True)
+                render_metric_card("Difficulty Difference", f"{abs(diff_percentage):.1f}% {diff_text}")
+            else:
+                render_metric_card("Difficulty Difference", "N/A")
         
         with metrics_col2:
-            try:
+            if ai_estimated_time is not None and selected_question['estimated_time'] is not None:
                 # Calculate time difference
-                time_diff = ai_estimated_time - selected_question.estimated_time
+                time_diff = ai_estimated_time - selected_question['estimated_time']
                 time_diff_text = "longer" if time_diff > 0 else "shorter"
                 
-                st.markdown("<div class='metric-card'>", unsafe_allow_html=True)
-                st.markdown(f"<div class='metric-label'>Time Estimate Difference</div>", unsafe_allow_html=True)
-                st.markdown(f"<div class='metric-value'>{abs(time_diff)} min {time_diff_text}</div>", unsafe_allow_html=True)
-                st.markdown("</div>", unsafe_allow_html=True)
-            except:
-                st.markdown("<div class='metric-card'>", unsafe_allow_html=True)
-                st.markdown(f"<div class='metric-label'>Time Estimate Difference</div>", unsafe_allow_html=True)
-                st.markdown(f"<div class='metric-value'>N/A</div>", unsafe_allow_html=True)
-                st.markdown("</div>", unsafe_allow_html=True)
+                render_metric_card("Time Estimate Difference", f"{abs(time_diff)} min {time_diff_text}")
+            else:
+                render_metric_card("Time Estimate Difference", "N/A")
         
         with metrics_col3:
-            try:
+            if ai_student_level is not None and selected_question['student_level']:
                 # Level agreement
-                level_match = ai_student_level.lower() == selected_question.student_level.lower()
+                level_match = ai_student_level.lower() == selected_question['student_level'].lower()
                 level_text = "Match" if level_match else "Mismatch"
                 level_color = "#28a745" if level_match else "#dc3545"
                 
-                st.markdown("<div class='metric-card'>", unsafe_allow_html=True)
-                st.markdown(f"<div class='metric-label'>Student Level</div>", unsafe_allow_html=True)
-                st.markdown(f"<div class='metric-value' style='color: {level_color};'>{level_text}</div>", unsafe_allow_html=True)
-                st.markdown("</div>", unsafe_allow_html=True)
-            except:
-                st.markdown("<div class='metric-card'>", unsafe_allow_html=True)
-                st.markdown(f"<div class='metric-label'>Student Level</div>", unsafe_allow_html=True)
-                st.markdown(f"<div class='metric-value'>N/A</div>", unsafe_allow_html=True)
-                st.markdown("</div>", unsafe_allow_html=True)
+                render_metric_card("Student Level", level_text, color=level_color)
+            else:
+                render_metric_card("Student Level", "N/A")
         
         # Create comparison charts
         chart_col1, chart_col2 = st.columns(2)
         
         with chart_col1:
             # Difficulty comparison chart
-            try:
-                fig = go.Figure()
-                
-                fig.add_trace(go.Bar(
-                    x=['Professor', 'AI Model'],
-                    y=[selected_question.difficulty, difficulty_rating],
-                    marker_color=['#4e73df', '#36b9cc'],
-                    text=[f"{selected_question.difficulty}/5.0", f"{difficulty_rating}/5.0"],
-                    textposition='auto'
-                ))
-                
-                fig.update_layout(
+            if difficulty_rating is not None:
+                fig = build_comparison_bar(
+                    (selected_question['difficulty'], difficulty_rating),
+                    (f"{selected_question['difficulty']}/5.0", f"{difficulty_rating}/5.0"),
                     title="Difficulty Rating Comparison",
-                    yaxis=dict(title="Difficulty (1-5)", range=[0, 5.5]),
-                    height=300,
-                    margin=dict(l=20, r=20, t=40, b=20),
-                    plot_bgcolor='rgba(0,0,0,0)'
+                    yaxis_title="Difficulty (1-5)",
+                    yrange=(0, 5.5)
                 )
                 
-                st.plotly_chart(fig, use_container_width=True)
-            except:
+                st.plotly_chart(fig, use_container_width=True, config=STATIC_CHART_CONFIG)
+            else:
                 st.info("Could not generate difficulty comparison chart.")
         
         with chart_col2:
             # Time estimate comparison chart
-            try:
-                fig = go.Figure()
-                
-                fig.add_trace(go.Bar(
-                    x=['Professor', 'AI Model'],
-                    y=[selected_question.estimated_time, ai_estimated_time],
-                    marker_color=['#4e73df', '#36b9cc'],
-                    text=[f"{selected_question.estimated_time} min", f"{ai_estimated_time} min"],
-                    textposition='auto'
-                ))
-                
-                fig.update_layout(
+            if ai_estimated_time is not None:
+                fig = build_comparison_bar(
+                    (selected_question['estimated_time'], ai_estimated_time),
+                    (f"{selected_question['estimated_time']} min", f"{ai_estimated_time} min"),
                     title="Time Estimate Comparison",
-                    yaxis=dict(title="Time (minutes)"),
-                    height=300,
-                    margin=dict(l=20, r=20, t=40, b=20),
-                    plot_bgcolor='rgba(0,0,0,0)'
+                    yaxis_title="Time (minutes)"
                 )
                 
-                st.plotly_chart(fig, use_container_width=True)
-            except:
+                st.plotly_chart(fig, use_container_width=True, config=STATIC_CHART_CONFIG)
+            else:
                 st.info("Could not generate time estimate comparison chart.")
         
         # Display AI analysis text
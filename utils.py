@@ -7,7 +7,12 @@ import re
 import logging
 from functools import wraps
 import time
+import bisect
 from typing import List, Dict, Any, Optional, Callable
+from sqlalchemy import func, insert
+from sqlalchemy.orm import selectinload
+from database import get_db, get_session_factory
+from models import Course, Chapter, Question
 
 # Configure logging
 logging.basicConfig(
@@ -129,6 +134,214 @@ def cache_data(ttl_seconds=300):
     
     return decorator
 
+# Cached DB lookups
+@st.cache_data(ttl=300)
+def load_course_catalog() -> dict:
+    """
+    Load every course with its chapters and up to 3 example questions per chapter.
+    
+    Shared by the question generator pages. Courses and chapters come from one
+    eager-loaded query and the examples from one windowed query, returned as plain
+    dicts keyed by id: {course_id: {"title", "chapters": {chapter_id: {...}}}}.
+    """
+    db = next(get_db())
+    courses = db.query(Course).options(selectinload(Course.chapters)).all()
+    
+    # Only the first 3 questions of each chapter are read, instead of every question
+    ranked = db.query(
+        Question.chapter_id,
+        Question.content,
+        func.row_number().over(partition_by=Question.chapter_id, order_by=Question.id).label("rank")
+    ).subquery()
+    example_rows = db.query(ranked.c.chapter_id, ranked.c.content).filter(
+        ranked.c.rank <= 3
+    ).order_by(ranked.c.chapter_id, ranked.c.rank)
+    
+    examples = {}
+    for chapter_id, content in example_rows:
+        examples.setdefault(chapter_id, []).append(content)
+    
+    return {
+        course.id: {
+            "title": course.title,
+            "chapters": {
+                chapter.id: {
+                    "title": chapter.title,
+                    "summary": chapter.summary,
+                    "ilos": chapter.ilos,
+                    "examples": examples.get(chapter.id, [])
+                }
+                for chapter in course.chapters
+            }
+        }
+        for course in courses
+    }
+
+@st.cache_data(ttl=300)
+def load_course_options() -> list:
+    """(id, title) tuples for course selectboxes."""
+    db = next(get_db())
+    return [(c.id, c.title) for c in db.query(Course.id, Course.title)]
+
+@st.cache_data(ttl=300)
+def load_chapter_options() -> list:
+    """(id, "course - chapter") tuples for chapter selectboxes."""
+    db = next(get_db())
+    rows = db.query(Chapter.id, Chapter.title, Course.title).join(Course, Chapter.course_id == Course.id)
+    return [(chapter_id, f"{course_title} - {chapter_title}") for chapter_id, chapter_title, course_title in rows]
+
+def _exam_questions_query(db):
+    """Questions that belong to an existing chapter and course, in a stable order."""
+    return db.query(Question).join(
+        Chapter, Question.chapter_id == Chapter.id
+    ).join(
+        Course, Chapter.course_id == Course.id
+    )
+
+@st.cache_data(ttl=60)
+def count_exam_questions() -> int:
+    """Count the questions available for the exam view."""
+    db = next(get_db())
+    return _exam_questions_query(db).count()
+
+@st.cache_data(ttl=60)
+def load_exam_page(page: int, per_page: int) -> list:
+    """Fetch one page of questions for the exam view as plain dicts."""
+    db = next(get_db())
+    
+    # Chapters and courses are loaded in two extra lookup queries instead of
+    # repeating their titles on every question row
+    questions = _exam_questions_query(db).options(
+        selectinload(Question.chapter).selectinload(Chapter.course)
+    ).order_by(Question.id).limit(per_page).offset((page - 1) * per_page).all()
+    
+    return [
+        {
+            "content": q.content,
+            "difficulty": q.difficulty,
+            "difficulty_text": q.difficulty_label or difficulty_label(q.difficulty),
+            "estimated_time": q.estimated_time,
+            "question_type": q.question_type,
+            "correct_answer": q.correct_answer,
+            "chapter_title": q.chapter.title,
+            "course_title": q.chapter.course.title
+        }
+        for q in questions
+    ]
+
+@st.cache_data(ttl=300, max_entries=32)
+def load_question_previews(course_id: int) -> dict:
+    """Return an id -> content preview mapping for the questions of a course, or of all courses if course_id is 0."""
+    db = get_session_factory()()
+    try:
+        # The database builds the preview label, so only the id and ~50 characters
+        # per question are sent back and no ORM objects are built
+        preview = func.substr(Question.content, 1, 50).concat("...").label("preview")
+        query = db.query(Question.id, preview).join(Chapter).join(Course)
+        if course_id != 0:
+            query = query.filter(Course.id == course_id)
+        # Rows are (id, preview) pairs, so dict() builds the mapping without a Python-level loop
+        return dict(query.all())
+    finally:
+        db.close()
+
+def _question_details_query(db):
+    """Question fields with the chapter and course fields taken from the same JOIN."""
+    return db.query(
+        Question.id,
+        Question.content,
+        Question.question_type,
+        Question.difficulty,
+        Question.estimated_time,
+        Question.student_level,
+        Chapter.title.label("chapter_title"),
+        Chapter.ilos,
+        Course.title.label("course_title")
+    ).join(
+        Chapter, Question.chapter_id == Chapter.id
+    ).join(
+        Course, Chapter.course_id == Course.id
+    )
+
+@st.cache_data(ttl=300, max_entries=256)
+def load_question_details(question_id: int) -> Optional[dict]:
+    """Return one question with its chapter and course fields as a dict, or None if it doesn't exist."""
+    db = get_session_factory()()
+    try:
+        row = _question_details_query(db).filter(Question.id == question_id).first()
+        return dict(row._mapping) if row else None
+    finally:
+        db.close()
+
+@st.cache_data(ttl=300, max_entries=32)
+def load_question_details_many(question_ids: tuple) -> list:
+    """Return the load_question_details dicts for several questions, ordered by id."""
+    db = get_session_factory()()
+    try:
+        rows = _question_details_query(db).filter(Question.id.in_(question_ids)).order_by(Question.id).all()
+        return [dict(row._mapping) for row in rows]
+    finally:
+        db.close()
+
+# Bumped by clear_course_caches so that pages keeping a session copy of the course
+# options know to rebuild it
+_course_options_version = 0
+
+def course_options_version() -> int:
+    """Return a counter that changes whenever the cached course options are cleared."""
+    return _course_options_version
+
+def clear_question_caches():
+    """Drop the cached question listings after questions are added or changed."""
+    count_exam_questions.clear()
+    load_exam_page.clear()
+    load_course_catalog.clear()
+    load_question_previews.clear()
+    load_question_details.clear()
+    load_question_details_many.clear()
+
+def clear_course_caches():
+    """Drop the cached course and chapter listings, and the question listings that show their titles."""
+    global _course_options_version
+    load_course_options.clear()
+    load_chapter_options.clear()
+    _course_options_version += 1
+    clear_question_caches()
+
+def add_questions_bulk(rows: list) -> int:
+    """
+    Insert many questions with a single executemany INSERT and one commit.
+    
+    Args:
+        rows: List of dicts keyed by Question column names (chapter_id, content, ...)
+        
+    Returns:
+        Number of inserted questions
+    """
+    if not rows:
+        return 0
+    
+    # Fill in the stored label for rows that don't carry one
+    rows = [
+        row if row.get("difficulty_label") or row.get("difficulty") is None
+        else {**row, "difficulty_label": difficulty_label(row["difficulty"])}
+        for row in rows
+    ]
+    
+    db = next(get_db())
+    try:
+        db.execute(insert(Question), rows)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error bulk inserting questions: {str(e)}")
+        raise
+    
+    # Make the new questions visible in the exam view right away
+    clear_question_caches()
+    
+    return len(rows)
+
 # Data Visualization
 def create_difficulty_chart(data):
     """Create a histogram of question difficulty."""
@@ -155,6 +368,19 @@ def create_gpa_correlation_chart(data):
     )
     return fig
 
+# Inclusive upper bounds of the Easy and Medium bands on the 1-5 difficulty scale
+DIFFICULTY_THRESHOLDS = (2.5, 3.5)
+DIFFICULTY_LABELS = ("Easy", "Medium", "Hard")
+
+def difficulty_band(difficulty: float) -> int:
+    """Return the index of the band a 1-5 difficulty falls in (0 easy, 1 medium, 2 hard)."""
+    # bisect_left puts a value equal to a threshold in the lower band
+    return bisect.bisect_left(DIFFICULTY_THRESHOLDS, difficulty)
+
+def difficulty_label(difficulty: float) -> str:
+    """Convert a 1-5 difficulty value to Easy/Medium/Hard."""
+    return DIFFICULTY_LABELS[difficulty_band(difficulty)]
+
 def format_ilos(ilos_text):
     """Convert ILOs text to formatted list."""
     if not ilos_text: